@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Microbenchmarks of the Python overhead of gpib_ctypes wrappers.
+
+Runs every wrapper against a library which does no IO, either the stub
+library built from stub_gpib.c or the simulated library, and compares it
+with calling the bound library function directly through ctypes.
+
+For each wrapper and payload size the results hold the calls per second,
+latency percentiles in microseconds, the peak memory allocated during one
+call in bytes (measured with tracemalloc, so it includes the objects the
+call returns) and the number of memory blocks still allocated after the
+calls, which should be 0. Results are printed as a table and can be
+written as JSON for comparison between releases.
+
+Example usage:
+
+cc -O2 -shared -fPIC -o /tmp/libgpib_stub.so benchmarks/stub_gpib.c
+python benchmarks/bench_wrappers.py --lib /tmp/libgpib_stub.so -o bench.json
+"""
+
+import argparse
+import ctypes
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import gpib_ctypes
+from gpib_ctypes import gpib
+from gpib_ctypes.Gpib import Gpib
+from gpib_ctypes.gpib import fast
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+DEFAULT_SIZES = (1, 64, 4096, 65536)
+
+
+def cases(handle, sizes):
+    """Build the benchmarked calls.
+
+    Returns:
+        list: (name, payload size, baseline name or None, callable)
+    """
+
+    lib = gpib.gpib._lib
+    device = Gpib(handle)
+    spb = ctypes.c_char()
+    spb_ref = ctypes.byref(spb)
+    value = ctypes.c_int()
+    value_ref = ctypes.byref(value)
+
+    result = [
+        ('ctypes.ibrpp', 0, None, lambda: lib.ibrpp(0, spb_ref)),
+        ('gpib.parallel_poll', 0, 'ctypes.ibrpp',
+         lambda: gpib.parallel_poll(0)),
+        ('fast.parallel_poll', 0, 'ctypes.ibrpp',
+         lambda: fast.parallel_poll(0)),
+        ('ctypes.ibrsp', 0, None, lambda: lib.ibrsp(handle, spb_ref)),
+        ('gpib.serial_poll', 0, 'ctypes.ibrsp',
+         lambda: gpib.serial_poll(handle)),
+        ('Gpib.serial_poll', 0, 'ctypes.ibrsp', device.serial_poll),
+        ('fast.serial_poll', 0, 'ctypes.ibrsp',
+         lambda: fast.serial_poll(handle)),
+        ('ctypes.ibask', 0, None,
+         lambda: lib.ibask(handle, gpib.IbaTMO, value_ref)),
+        ('gpib.ask', 0, 'ctypes.ibask', lambda: gpib.ask(handle, gpib.IbaTMO)),
+        ('Gpib.ask', 0, 'ctypes.ibask', lambda: device.ask(gpib.IbaTMO)),
+        ('fast.ask', 0, 'ctypes.ibask', lambda: fast.ask(handle, gpib.IbaTMO)),
+        ('ctypes.ibtrg', 0, None, lambda: lib.ibtrg(handle)),
+        ('gpib.trigger', 0, 'ctypes.ibtrg', lambda: gpib.trigger(handle)),
+        ('Gpib.trigger', 0, 'ctypes.ibtrg', device.trigger),
+        ('fast.trigger', 0, 'ctypes.ibtrg', lambda: fast.trigger(handle)),
+        ('gpib.query', 0, None, lambda: gpib.query(handle, b'*IDN?')),
+        ('gpib.query_many', 0, None,
+         lambda: gpib.query_many(handle, (b'*IDN?',))),
+        ('gpib.query_many+gil', 0, None,
+         lambda: gpib.query_many(handle, (b'*IDN?',), hold_gil=True)),
+    ]
+
+    for size in sizes:
+        data = b'x' * size
+        buf = ctypes.create_string_buffer(size)
+        into = bytearray(size)
+        result.extend([
+            ('ctypes.ibwrt', size, None,
+             lambda data=data, size=size: lib.ibwrt(handle, data, size)),
+            ('gpib.write', size, 'ctypes.ibwrt',
+             lambda data=data: gpib.write(handle, data)),
+            ('Gpib.write', size, 'ctypes.ibwrt',
+             lambda data=data: device.write(data)),
+            ('fast.write', size, 'ctypes.ibwrt',
+             lambda data=data: fast.write(handle, data)),
+            ('ctypes.ibrd', size, None,
+             lambda buf=buf, size=size: lib.ibrd(handle, buf, size)),
+            ('gpib.read', size, 'ctypes.ibrd',
+             lambda size=size: gpib.read(handle, size)),
+            ('gpib.read_into', size, 'ctypes.ibrd',
+             lambda into=into: gpib.read_into(handle, into)),
+            ('Gpib.read', size, 'ctypes.ibrd',
+             lambda size=size: device.read(size)),
+            ('fast.read', size, 'ctypes.ibrd',
+             lambda size=size: fast.read(handle, size)),
+        ])
+    return result
+
+
+def measure(func, calls, alloc_calls):
+    """Benchmark one callable.
+
+    Returns:
+        dict: calls_per_sec, latency_us percentiles, alloc_peak_bytes and
+            retained_blocks
+    """
+
+    for i in range(min(calls, 1000)):
+        func()
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = _clock()
+        for i in range(calls):
+            func()
+        total = _clock() - start
+
+        latencies = []
+        for i in range(calls):
+            t = _clock()
+            func()
+            latencies.append(_clock() - t)
+    finally:
+        gc.enable()
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1,
+                             int(p / 100.0 * len(latencies)))] * 1e6
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks = 0
+        for i in range(alloc_calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            peaks += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    retained = _retained(func, alloc_calls) - _retained(_noop, alloc_calls)
+
+    return {
+        'calls_per_sec': calls / total,
+        'latency_us': {
+            'mean': total / calls * 1e6,
+            'p50': percentile(50),
+            'p90': percentile(90),
+            'p99': percentile(99),
+            'max': latencies[-1] * 1e6,
+        },
+        'alloc_peak_bytes': peaks // alloc_calls,
+        'retained_blocks': max(0, retained),
+    }
+
+
+def _noop():
+    pass
+
+
+def _retained(func, calls):
+    """Number of memory blocks still allocated after calling func."""
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for i in range(calls):
+        func()
+    gc.collect()
+    return sys.getallocatedblocks() - blocks
+
+
+def run(handle, sizes, calls, alloc_calls):
+    results = []
+    baselines = {}
+    for name, size, baseline, func in cases(handle, sizes):
+        result = measure(func, calls, alloc_calls)
+        result.update({'name': name, 'payload': size, 'baseline': baseline})
+        if baseline is None:
+            baselines[(name, size)] = result
+        else:
+            base = baselines[(baseline, size)]['latency_us']['mean']
+            result['overhead_us'] = result['latency_us']['mean'] - base
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--lib', help="stub GPIB library to load")
+    source.add_argument('--sim', metavar='CONFIG', nargs='?', const='',
+                        help="use the simulated library, optionally with "
+                             "a configuration file")
+    parser.add_argument('--pad', type=int, default=1,
+                        help="device primary address, default 1")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma separated payload sizes of reads and "
+                             "writes, default %(default)s")
+    parser.add_argument('--calls', type=int, default=20000,
+                        help="timed calls per benchmark, default "
+                             "%(default)s")
+    parser.add_argument('--alloc-calls', type=int, default=200,
+                        help="calls per benchmark for memory statistics, "
+                             "default %(default)s")
+    parser.add_argument('-o', '--output', help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.lib:
+        library = os.path.abspath(args.lib)
+        loaded = gpib._load_lib(library)
+    else:
+        library = "sim:" + args.sim
+        loaded = gpib._load_lib(library)
+        if not args.sim:
+            from gpib_ctypes.gpib.sim import SimInstrument
+            sim = gpib.gpib._lib
+            sim.time_scale = 0
+            sim.add_instrument(0, args.pad, SimInstrument(default='x'))
+    if not loaded:
+        parser.error("could not load {:s}".format(library))
+
+    fast.bind()
+    handle = gpib.dev(0, args.pad)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run(handle, sizes, args.calls, args.alloc_calls)
+    gpib.close(handle)
+
+    print("{:20s} {:>7s} {:>12s} {:>9s} {:>9s} {:>9s} {:>10s} {:>9s}".format(
+        "benchmark", "payload", "calls/s", "p50 us", "p99 us", "+us",
+        "peak B", "retained"))
+    for r in results:
+        print("{:20s} {:7d} {:12.0f} {:9.2f} {:9.2f} {:>9s} {:10d} "
+              "{:9d}".format(
+                  r['name'], r['payload'], r['calls_per_sec'],
+                  r['latency_us']['p50'], r['latency_us']['p99'],
+                  "{:.2f}".format(r['overhead_us']) if r['baseline'] else "",
+                  r['alloc_peak_bytes'], r['retained_blocks']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'gpib_ctypes': gpib_ctypes.__version__,
+                    'python': platform.python_implementation() + ' ' +
+                    platform.python_version(),
+                    'platform': platform.platform(),
+                    'library': library,
+                    'calls': args.calls,
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
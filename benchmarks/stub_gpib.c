@@ -0,0 +1,80 @@
+/*
+ * Minimal GPIB library for measuring the Python overhead of gpib_ctypes.
+ *
+ * Every call succeeds at once; reads fill the buffer with the requested
+ * number of bytes and set END. Build with
+ *
+ *     cc -O2 -shared -fPIC -o libgpib_stub.so stub_gpib.c
+ *
+ * and add -DNO_THREAD_STATUS to leave out ThreadIbsta() and friends, so
+ * that gpib_ctypes falls back to the global status variables.
+ *
+ * Tests make the next call fail by setting stub_error_sta to the ibsta
+ * bits to add to ERR and stub_error_err to the iberr value.
+ */
+
+#include <string.h>
+
+#define CMPL 0x100
+#define END 0x2000
+#define ERR 0x8000
+
+int ibsta, iberr;
+long ibcntl;
+
+int stub_error_sta, stub_error_err;
+
+static int ok(long count)
+{
+	if (stub_error_err) {
+		ibsta = ERR | stub_error_sta;
+		iberr = stub_error_err;
+		ibcntl = 0;
+		stub_error_sta = stub_error_err = 0;
+		return ibsta;
+	}
+	ibsta = CMPL;
+	iberr = 0;
+	ibcntl = count;
+	return ibsta;
+}
+
+#ifndef NO_THREAD_STATUS
+int ThreadIbsta(void) { return ibsta; }
+int ThreadIberr(void) { return iberr; }
+long ThreadIbcntl(void) { return ibcntl; }
+#endif
+
+int ibask(int ud, int option, int *value) { *value = 0; return ok(0); }
+int ibclr(int ud) { return ok(0); }
+int ibcmd(int ud, const char *cmd, long count) { return ok(count); }
+int ibconfig(int ud, int option, int value) { return ok(0); }
+int ibdev(int board, int pad, int sad, int tmo, int eot, int eos) { ok(0); return 16 + pad; }
+int ibfind(const char *name) { ok(0); return 0; }
+int ibln(int ud, int pad, int sad, short *found) { *found = 1; return ok(0); }
+int iblines(int ud, short *lines) { *lines = 0; return ok(0); }
+int ibloc(int ud) { return ok(0); }
+int ibonl(int ud, int online) { return ok(0); }
+int ibppc(int ud, int v) { return ok(0); }
+int ibrpp(int ud, char *ppr) { *ppr = 0; return ok(0); }
+int ibrsp(int ud, char *spr) { *spr = 0; return ok(0); }
+int ibsic(int ud) { return ok(0); }
+int ibspb(int ud, short *count) { *count = 0; return ok(0); }
+int ibsre(int ud, int enable) { return ok(0); }
+int ibstop(int ud) { return ok(0); }
+int ibtmo(int ud, int tmo) { return ok(0); }
+int ibtrg(int ud) { return ok(0); }
+int ibwait(int ud, int mask) { return ok(0); }
+int ibwrt(int ud, const char *buf, long count) { return ok(count); }
+int ibwrta(int ud, const char *buf, long count) { return ok(count); }
+
+int ibrd(int ud, char *buf, long count)
+{
+	if (ok(count) & ERR)
+		return ibsta;
+	memset(buf, 'x', count);
+	ibsta |= END;
+	return ibsta;
+}
+
+int ibrda(int ud, char *buf, long count) { return ibrd(ud, buf, count); }
@@ -4,12 +4,24 @@
 # Use, modification and distribution is subject to the
 # GNU GENERAL PUBLIC LICENSE, Version 2
 
+import weakref
+
 import gpib_ctypes.gpib as gpib
 
 RQS = (1 << 11)
 SRQ = (1 << 12)
 TIMO = (1 << 14)
 
+# Gpib objects with a handle to close or release
+_open = weakref.WeakSet()
+
+
+def close_all():
+    '''Close all Gpib objects of the process which have not been closed,
+    eg. before exiting instead of relying on their finalizers.'''
+    for obj in list(_open):
+        obj.close()
+
 
 class Gpib(object):
     '''Three ways to create a Gpib object:
@@ -18,37 +30,85 @@ class Gpib(object):
     Gpib(board_index)
         returns a board object, with the given board number
     Gpib(board_index, pad[, sad[, timeout[, send_eoi[, eos_mode]]]])
-        returns a device object, like ibdev()'''
+        returns a device object, like ibdev()
+
+    Pass handle_pool, a gpib.HandlePool, to borrow the handle from the
+    pool instead of opening and closing a handle for every object. The
+    class attribute Gpib.handle_pool is the default.
+
+    Like in linux-gpib, methods keep their result in the res attribute, and
+    serial_poll() in spb. Pass retain_results=False to only return results,
+    so that large replies are freed as soon as the caller drops them. The
+    class attribute Gpib.retain_results is the default.
+
+    Use the object as a context manager, or call close() or close_all(), to
+    close its handle deterministically.'''
 
-    def __init__(self, name='gpib0', pad=None, sad=0, timeout=13, send_eoi=1, eos_mode=0):
+    __slots__ = ('id', 'res', 'spb', '_own', '_pooled', '_retain',
+                 '__weakref__')
+
+    # defaults of the handle_pool and retain_results arguments
+    handle_pool = None
+    retain_results = True
+
+    def __init__(self, name='gpib0', pad=None, sad=0, timeout=13, send_eoi=1,
+                 eos_mode=0, retain_results=None, handle_pool=None):
         self._own = False
+        self._pooled = None
+        self._retain = self.retain_results if retain_results is None \
+            else retain_results
+        pool = self.handle_pool if handle_pool is None else handle_pool
         if isinstance(name, str):
-            self.id = gpib.find(name)
-            self._own = True
+            if pool is None:
+                self.id = gpib.find(name)
+                self._own = True
+            else:
+                self._pooled = pool.find(name)
+                self.id = self._pooled.handle
         elif pad is None:
             self.id = name
-        else:
+        elif pool is None:
             self.id = gpib.dev(name, pad, sad, timeout, send_eoi, eos_mode)
             self._own = True
+        else:
+            self._pooled = pool.dev(name, pad, sad, timeout, send_eoi,
+                                    eos_mode)
+            self.id = self._pooled.handle
+        if self._own or self._pooled is not None:
+            _open.add(self)
 
     # automatically close descriptor when instance is deleted
     def __del__(self):
         self.close()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def __repr__(self):
         return "%s(%d)" % (self.__class__.__name__, self.id)
 
     def close(self):
+        if self._pooled is not None:
+            self._pooled.release()
+            self._pooled = None
         if self._own:
-            gpib.close(self.id)
             self._own = False
+            gpib.close(self.id)
+        _open.discard(self)
+
+    def _result(self, res):
+        if self._retain:
+            self.res = res
+        return res
 
     def command(self, str):
         gpib.command(self.id, str)
 
     def config(self, option, value):
-        self.res = gpib.config(self.id, option, value)
-        return self.res
+        return self._result(gpib.config(self.id, option, value))
 
     def interface_clear(self):
         gpib.interface_clear(self.id)
@@ -59,21 +119,38 @@ class Gpib(object):
     def write_async(self, str):
         gpib.write_async(self.id, str)
 
+    def start_write(self, str):
+        return gpib.start_write(self.id, str)
+
+    def start_read(self, len=512):
+        return gpib.start_read(self.id, len)
+
     def read(self, len=512):
-        self.res = gpib.read(self.id, len)
-        return self.res
+        return self._result(gpib.read(self.id, len))
+
+    def query(self, str, max_len=None):
+        return self._result(gpib.query(self.id, str, max_len))
+
+    def query_many(self, cmds, max_len=None, hold_gil=False):
+        return gpib.query_many(self.id, cmds, max_len, hold_gil)
+
+    def read_into(self, buf, offset=0, nbytes=None):
+        return self._result(gpib.read_into(self.id, buf, offset, nbytes))
+
+    def read_block(self, into=None, chunk_size=None):
+        return self._result(gpib.read_block(self.id, into, chunk_size))
+
+    def iter_read(self, chunk_size=65536):
+        return gpib.iter_read(self.id, chunk_size)
 
     def listener(self, pad, sad=0):
-        self.res = gpib.listener(self.id, pad, sad)
-        return self.res
+        return self._result(gpib.listener(self.id, pad, sad))
 
     def lines(self):
-        self.res = gpib.lines(self.id)
-        return self.res
+        return self._result(gpib.lines(self.id))
 
     def ask(self, option):
-        self.res = gpib.ask(self.id, option)
-        return self.res
+        return self._result(gpib.ask(self.id, option))
 
     def clear(self):
         gpib.clear(self.id)
@@ -82,8 +159,10 @@ class Gpib(object):
         gpib.wait(self.id, mask)
 
     def serial_poll(self):
-        self.spb = gpib.serial_poll(self.id)
-        return self.spb
+        spb = gpib.serial_poll(self.id)
+        if self._retain:
+            self.spb = spb
+        return spb
 
     def trigger(self):
         gpib.trigger(self.id)
@@ -92,16 +171,13 @@ class Gpib(object):
         gpib.remote_enable(self.id, val)
 
     def ibloc(self):
-        self.res = gpib.ibloc(self.id)
-        return self.res
+        return self._result(gpib.ibloc(self.id))
 
     def ibsta(self):
-        self.res = gpib.ibsta()
-        return self.res
+        return self._result(gpib.ibsta())
 
     def ibcnt(self):
-        self.res = gpib.ibcnt()
-        return self.res
+        return self._result(gpib.ibcnt())
 
     def timeout(self, value):
         return gpib.timeout(self.id, value)
@@ -9,7 +9,7 @@ __version__ = '0.1.0dev'
 __all__ = ['gpib', 'Gpib', 'make_default_gpib']
 
 import gpib_ctypes.gpib
-import gpib_ctypes.Gpib
+# gpib_ctypes.Gpib is imported on first use, eg. from gpib_ctypes import Gpib
 
 
 def make_default_gpib():
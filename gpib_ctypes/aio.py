@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+"""asyncio interface to gpib_ctypes.gpib. Requires Python 3.7 or newer.
+
+Each blocking library call runs on a worker thread dedicated to the GPIB
+board the handle belongs to. Calls on one board are executed in the order
+they were awaited, while calls on different boards run in parallel and
+none of them block the event loop. The board of a handle used for the
+first time is looked up on a thread of the loop's default executor.
+
+Example usage:
+
+from gpib_ctypes import aio
+
+async def identify(handle):
+    return await aio.query(handle, b'*IDN?')
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import gpib_ctypes.gpib as gpib
+
+__all__ = ['Dispatcher', 'run', 'dev', 'close', 'clear', 'command', 'read',
+           'read_block', 'write', 'query', 'serial_poll', 'trigger', 'wait',
+           'shutdown']
+
+
+class Dispatcher(object):
+    """Runs library calls on one worker thread per board.
+
+    Cancelling an awaited call which has not started yet removes it from
+    the board queue. Cancelling a call in progress calls ibstop, which
+    aborts the asynchronous transfers of read(), write() and query().
+    Other calls in progress finish, at the latest at the handle timeout,
+    and their result is discarded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executors = {}  # board index -> single thread executor
+        self._boards = {}     # handle -> board index
+
+    def board_of(self, handle):
+        """Get the board index of a handle, see gpib.board_index().
+
+        Args:
+            handle (int): board or device handle
+
+        Returns:
+            int: board index
+        """
+
+        try:
+            return self._boards[handle]
+        except KeyError:
+            board = self._boards[handle] = gpib.board_index(handle)
+            return board
+
+    def forget(self, handle):
+        """Drop the cached board index of a closed handle.
+
+        Args:
+            handle (int): board or device handle
+        """
+
+        self._boards.pop(handle, None)
+
+    def executor(self, board):
+        """Get the worker executing calls on a board, starting it if needed.
+
+        Args:
+            board (int): board index
+
+        Returns:
+            concurrent.futures.Executor: single thread executor
+        """
+
+        with self._lock:
+            try:
+                return self._executors[board]
+            except KeyError:
+                executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='gpib{:d}'.format(board))
+                self._executors[board] = executor
+                return executor
+
+    async def run_on_board(self, board, handle, func, *args):
+        """Call func(*args) on the worker of a board.
+
+        Args:
+            board (int): board index
+            handle (int): handle to abort with ibstop on cancellation,
+                or None
+            func (callable): blocking function to call
+            *args: arguments to func
+
+        Returns:
+            return value of func
+        """
+
+        future = self.executor(board).submit(func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if handle is not None and future.running():
+                try:
+                    gpib.stop(handle)
+                except gpib.GpibError:
+                    pass
+            raise
+
+    async def run(self, handle, func, *args):
+        """Call func(handle, *args) on the worker of the handle's board.
+
+        Args:
+            handle (int): board or device handle
+            func (callable): blocking function taking handle as its first
+                argument, typically one of gpib_ctypes.gpib functions
+            *args: remaining arguments to func
+
+        Returns:
+            return value of func
+        """
+
+        try:
+            board = self._boards[handle]
+        except KeyError:
+            # gpib.board_index() calls the library, which may block
+            board = await asyncio.get_running_loop().run_in_executor(
+                None, self.board_of, handle)
+        return await self.run_on_board(board, handle, func, handle, *args)
+
+    def shutdown(self, wait=True):
+        """Stop all board workers. Calls already queued are completed.
+
+        Args:
+            wait (bool): block until the workers have exited, default True
+        """
+
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait)
+
+
+_dispatcher = Dispatcher()
+
+# bytes read per asynchronous transfer by query()
+_QUERY_CHUNK = 4096
+
+
+def _read(handle, length):
+    """gpib.read() as an asynchronous transfer, which ibstop aborts."""
+
+    return gpib.start_read(handle, length).result()
+
+
+def _write(handle, data):
+    """gpib.write() as an asynchronous transfer, which ibstop aborts."""
+
+    transfer = gpib.start_write(handle, data)
+    transfer.result()
+    return transfer.sta
+
+
+def _query(handle, data, max_len):
+    """gpib.query() as asynchronous transfers, which ibstop aborts."""
+
+    _write(handle, data)
+    chunks = []
+    count = 0
+    while True:
+        length = _QUERY_CHUNK if max_len is None else \
+            min(_QUERY_CHUNK, max_len - count)
+        transfer = gpib.start_read(handle, length)
+        chunk = transfer.result()
+        chunks.append(chunk)
+        count += len(chunk)
+        if transfer.sta & gpib.END or not chunk or count == max_len:
+            return b''.join(chunks)
+
+
+async def run(handle, func, *args):
+    """Call func(handle, *args) on the worker of the handle's board.
+
+    Args:
+        handle (int): board or device handle
+        func (callable): blocking function taking handle as its first
+            argument
+        *args: remaining arguments to func
+
+    Returns:
+        return value of func
+    """
+
+    return await _dispatcher.run(handle, func, *args)
+
+
+async def dev(board, pad, sad=gpib.NO_SAD, tmo=gpib.T30s, sendeoi=1, eos=0):
+    """Awaitable gpib.dev()."""
+
+    return await _dispatcher.run_on_board(
+        board, None, gpib.dev, board, pad, sad, tmo, sendeoi, eos)
+
+
+async def close(handle):
+    """Awaitable gpib.close()."""
+
+    sta = await run(handle, gpib.close)
+    _dispatcher.forget(handle)
+    return sta
+
+
+async def clear(handle):
+    """Awaitable gpib.clear()."""
+
+    return await run(handle, gpib.clear)
+
+
+async def command(handle, cmd):
+    """Awaitable gpib.command()."""
+
+    return await run(handle, gpib.command, cmd)
+
+
+async def read(handle, length=512):
+    """Awaitable gpib.read(), reading with an asynchronous transfer."""
+
+    return await run(handle, _read, length)
+
+
+async def read_block(handle, into=None, chunk_size=None):
+    """Awaitable gpib.read_block()."""
+
+    return await run(handle, gpib.read_block, into, chunk_size)
+
+
+async def write(handle, data):
+    """Awaitable gpib.write(), writing with an asynchronous transfer."""
+
+    return await run(handle, _write, data)
+
+
+async def query(handle, data, max_len=None):
+    """Awaitable gpib.query(), writing and reading with asynchronous
+    transfers. The command is written and the reply read as one call, so
+    that no other call on the same board runs in between.
+
+    Args:
+        handle (int): board or device handle
+        data (bytes): sequence of bytes to write
+        max_len (int): maximum number of bytes to read, default None
+            meaning read until END
+
+    Returns:
+        bytes: reply
+    """
+
+    return await run(handle, _query, data, max_len)
+
+
+async def serial_poll(handle):
+    """Awaitable gpib.serial_poll()."""
+
+    return await run(handle, gpib.serial_poll)
+
+
+async def trigger(handle):
+    """Awaitable gpib.trigger()."""
+
+    return await run(handle, gpib.trigger)
+
+
+async def wait(handle, eventmask):
+    """Awaitable gpib.wait()."""
+
+    return await run(handle, gpib.wait, eventmask)
+
+
+def shutdown(wait=True):
+    """Stop the board workers of the default dispatcher.
+
+    Args:
+        wait (bool): block until the workers have exited, default True
+    """
+
+    _dispatcher.shutdown(wait)
@@ -11,29 +11,60 @@ __email__ = 'tomislav.ivek@gmail.com'
 __version__ = '0.1.0'
 
 from .constants import *
+from .buffers import BufferPool
+from .handles import HandlePool
 from .gpib import \
+    addressed_read,\
+    addressed_write,\
+    as_completed,\
     ask,\
+    board_index,\
     clear,\
+    clear_list,\
     close,\
     command,\
     config,\
     dev,\
     find,\
+    find_listeners,\
     ibcnt,\
     ibloc,\
     ibsta,\
     interface_clear,\
+    last_status,\
+    iter_read,\
     lines,\
     listener,\
+    local_list,\
+    parallel_poll,\
+    parallel_poll_addresses,\
+    parallel_poll_config,\
+    parallel_poll_setup,\
+    parallel_poll_unconfig,\
+    query,\
+    query_many,\
     read,\
+    read_block,\
+    read_into,\
     remote_enable,\
+    remote_list,\
     serial_poll,\
+    serial_poll_many,\
+    set_addressing,\
+    set_read_pool,\
     spoll_bytes,\
+    start_read,\
+    start_write,\
+    stop,\
     timeout,\
     trigger,\
+    trigger_list,\
     version,\
     wait,\
     write,\
     write_async,\
+    write_broadcast,\
+    AsyncTransfer,\
     GpibError,\
+    IbStatus,\
     _load_lib
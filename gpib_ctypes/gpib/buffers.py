@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""Reusable ctypes buffers for the read path."""
+
+import ctypes
+import threading
+from collections import OrderedDict
+
+
+class BufferPool(object):
+    """Thread-safe pool of ctypes char buffers sorted into power-of-two
+    size buckets. Idle buffers are kept up to a total of max_bytes; when
+    the cap is exceeded the least recently released buffers are evicted.
+
+    Example usage:
+
+    pool = BufferPool(max_bytes=1 << 20)
+    buf = pool.acquire(512)  # at least 512 bytes long
+    ...
+    pool.release(buf)
+    """
+
+    def __init__(self, max_bytes=1 << 20, min_size=64):
+        """Create an empty pool.
+
+        Args:
+            max_bytes (int): cap on the total size of idle buffers,
+                default 1 MiB
+            min_size (int): size of the smallest bucket, default 64
+        """
+
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._buckets = {}          # bucket size -> list of idle buffer ids
+        self._idle = OrderedDict()  # buffer id -> buffer, oldest first
+        self._idle_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bucket_size(self, size):
+        """Get the size of the bucket which serves requests of given size.
+
+        Args:
+            size (int): requested buffer size
+
+        Returns:
+            int: smallest power of two not less than size and min_size
+        """
+
+        bucket = self.min_size
+        while bucket < size:
+            bucket <<= 1
+        return bucket
+
+    def acquire(self, size):
+        """Take a buffer from the pool, allocating a new one on a miss.
+
+        Args:
+            size (int): minimum buffer size
+
+        Returns:
+            ctypes.Array: char buffer of bucket_size(size) bytes
+        """
+
+        bucket = self.bucket_size(size)
+        with self._lock:
+            ids = self._buckets.get(bucket)
+            if ids:
+                buf = self._idle.pop(ids.pop())
+                self._idle_bytes -= bucket
+                self.hits += 1
+                return buf
+            self.misses += 1
+        return ctypes.create_string_buffer(bucket)
+
+    def release(self, buf):
+        """Return a buffer obtained by acquire() to the pool.
+
+        Args:
+            buf (ctypes.Array): buffer to return
+        """
+
+        bucket = len(buf)
+        if bucket > self.max_bytes:
+            return
+
+        with self._lock:
+            while self._idle_bytes + bucket > self.max_bytes:
+                old_id, old = self._idle.popitem(last=False)
+                self._buckets[len(old)].remove(old_id)
+                self._idle_bytes -= len(old)
+                self.evictions += 1
+            self._idle[id(buf)] = buf
+            self._buckets.setdefault(bucket, []).append(id(buf))
+            self._idle_bytes += bucket
+
+    def clear(self):
+        """Drop all idle buffers and reset the counters."""
+
+        with self._lock:
+            self._buckets.clear()
+            self._idle.clear()
+            self._idle_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Get pool usage counters.
+
+        Returns:
+            dict: hits, misses, evictions, idle_buffers and idle_bytes
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'idle_buffers': len(self._idle),
+                'idle_bytes': self._idle_bytes,
+            }
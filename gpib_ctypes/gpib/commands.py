@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""GPIB command bytes, sent with ATN asserted by gpib.command().
+
+Addressing sequences are built once and cached, so repeated transfers
+between the same devices do not rebuild them. Addresses are either a
+primary address or a (pad, sad) tuple, with sad as taken by gpib.dev().
+
+Example usage:
+
+from gpib_ctypes.gpib import commands
+
+# make the device at 5 talk and the devices at 7 and 9 listen
+gpib.command(board, commands.address(5, [7, 9]))
+"""
+
+from .constants import \
+    GTL, SDC, PPC, GET, TCT, LLO, DCL, PPU, SPE, SPD, \
+    LAD, UNL, TAD, UNT, SAD, PPE, PPD, NO_SAD
+
+# (kind, arguments) -> bytes, cleared when it reaches _CACHE_SIZE entries
+_cache = {}
+_CACHE_SIZE = 1024
+
+
+def MTA(pad):
+    """Get the talk address byte of a primary address."""
+
+    return TAD | pad
+
+
+def MLA(pad):
+    """Get the listen address byte of a primary address."""
+
+    return LAD | pad
+
+
+def MSA(sad):
+    """Get the secondary address byte of a secondary address, 0 to 30 or
+    0x60 to 0x7e.
+    """
+
+    return SAD | sad
+
+
+def pack(*cmds):
+    """Pack command byte values into bytes.
+
+    Args:
+        *cmds (int): command byte values
+
+    Returns:
+        bytes: command bytes
+    """
+
+    key = ('pack', cmds)
+    try:
+        return _cache[key]
+    except KeyError:
+        return _store(key, bytes(bytearray(cmds)))
+
+
+def talk(addr):
+    """Get the command bytes addressing a device to talk, without
+    unaddressing the bus first.
+
+    Args:
+        addr (int or tuple): device address
+
+    Returns:
+        bytes: command bytes
+    """
+
+    key = ('talk', addr)
+    try:
+        return _cache[key]
+    except KeyError:
+        return _store(key, bytes(bytearray(_addressed(MTA, addr))))
+
+
+def address(talker, listeners, suffix=()):
+    """Get the command bytes unlistening all devices, addressing a talker
+    and listeners and sending suffix.
+
+    Args:
+        talker (int or tuple): talker address, or None to leave the
+            talker unchanged
+        listeners (iterable): listener addresses
+        suffix (tuple): command byte values to send after addressing, eg.
+            (GET,), default ()
+
+    Returns:
+        bytes: command bytes
+    """
+
+    key = ('address', talker, tuple(listeners), tuple(suffix))
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+
+    cmds = [UNL]
+    if talker is not None:
+        cmds.extend(_addressed(MTA, talker))
+    for addr in key[2]:
+        cmds.extend(_addressed(MLA, addr))
+    cmds.extend(key[3])
+    return _store(key, bytes(bytearray(cmds)))
+
+
+def _split_address(addr):
+    """Split a primary address or (pad, sad) tuple into a (pad, sad) tuple."""
+
+    if isinstance(addr, tuple):
+        return addr
+    return addr, NO_SAD
+
+
+def _addressed(primary, addr):
+    pad, sad = _split_address(addr)
+    return (primary(pad), MSA(sad)) if sad else (primary(pad),)
+
+
+def _store(key, value):
+    if len(_cache) >= _CACHE_SIZE:
+        _cache.clear()
+    _cache[key] = value
+    return value
@@ -136,6 +136,36 @@ NO_SAD = 0
 ALL_SAD = -1
 
 
+# NI-488.2 address list terminator
+NOADDR = 0xffff
+
+
+# NI-488.2 end of transfer modes
+NULLend = 0x00  # no EOI
+NLend = 0x01    # send NL with EOI after the data
+DABend = 0x02   # send EOI with the last data byte
+
+
+# GPIB command bytes (sent with ATN asserted)
+GTL = 0x1       # go to local
+SDC = 0x4       # selected device clear
+PPC = 0x5       # parallel poll configure
+GET = 0x8       # group execute trigger
+TCT = 0x9       # take control
+LLO = 0x11      # local lockout
+DCL = 0x14      # device clear
+PPU = 0x15      # parallel poll unconfigure
+SPE = 0x18      # serial poll enable
+SPD = 0x19      # serial poll disable
+LAD = 0x20      # listen address, LAD | pad
+UNL = 0x3F      # unlisten
+TAD = 0x40      # talk address, TAD | pad
+UNT = 0x5F      # untalk
+SAD = 0x60      # secondary address, SAD | sad
+PPE = 0x60      # parallel poll enable
+PPD = 0x70      # parallel poll disable
+
+
 # GPIB status byte bits
 IbStbRQS = 0x40
 IbStbESB = 0x20
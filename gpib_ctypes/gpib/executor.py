@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""Parallel execution of GPIB operations across boards."""
+
+import concurrent.futures
+import threading
+
+from .gpib import board_index
+from .scheduler import BoardScheduler, NORMAL
+
+
+class BoardExecutor(object):
+    """Runs GPIB operations on one BoardScheduler per board index.
+
+    Operations are routed to the board of their handle, so operations on
+    one board run one at a time in priority order, and those on one handle
+    in the order they were submitted, while operations on different boards
+    run in parallel. Since library calls release the GIL, throughput
+    scales with the number of boards, except with libraries which only
+    provide global status variables, whose calls are serialized by
+    gpib_ctypes.
+
+    The handle of an operation is the id of the Gpib object if func is one
+    of its methods, else the first argument. Board indices of handles are
+    cached, call forget() after closing a handle.
+
+    Example usage:
+
+    executor = BoardExecutor()
+    results = executor.gather([
+        (gpib.query, dmm_handle, b'READ?'),     # board 0
+        (scope.read_block,),                    # board 1
+    ])
+    executor.shutdown()
+    """
+
+    def __init__(self, **options):
+        """Create an executor. Board workers are started on first use.
+
+        Args:
+            **options: keyword arguments of the BoardScheduler of each
+                board, eg. delays or chunk_size
+        """
+
+        self._options = options
+        self._lock = threading.Lock()
+        self._schedulers = {}  # board index -> BoardScheduler
+        self._boards = {}      # handle -> board index
+        self._stopping = False
+
+    def board_of(self, handle):
+        """Get the board index of a handle, see gpib.board_index().
+
+        Args:
+            handle (int): board or device handle
+
+        Returns:
+            int: board index
+        """
+
+        try:
+            return self._boards[handle]
+        except KeyError:
+            board = self._boards[handle] = board_index(handle)
+            return board
+
+    def forget(self, handle):
+        """Drop the cached board index of a closed handle.
+
+        Args:
+            handle (int): board or device handle
+        """
+
+        self._boards.pop(handle, None)
+
+    def scheduler(self, board):
+        """Get the scheduler of a board, starting it if needed.
+
+        Args:
+            board (int): board index
+
+        Returns:
+            BoardScheduler: scheduler of the board
+        """
+
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("BoardExecutor is shut down")
+            try:
+                return self._schedulers[board]
+            except KeyError:
+                scheduler = self._schedulers[board] = BoardScheduler(
+                    board, **self._options)
+                return scheduler
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a call of func(*args) on the board of its handle.
+
+        Args:
+            func (callable): function to call, typically one of
+                gpib_ctypes.gpib functions or a Gpib method
+            *args: arguments to func
+            priority (int): keyword only, INTERACTIVE, NORMAL or BULK,
+                default NORMAL
+
+        Returns:
+            concurrent.futures.Future: resolves to the return value of func
+        """
+
+        priority = kwargs.pop('priority', NORMAL)
+        if kwargs:
+            raise TypeError("unexpected keyword arguments: {:s}".format(
+                ", ".join(sorted(kwargs))))
+
+        handle = _handle_of(func, args)
+        if handle is None:
+            raise ValueError("cannot find the handle of {!r}".format(func))
+        return self.submit_to(self.board_of(handle), func, *args,
+                              priority=priority)
+
+    def submit_to(self, board, func, *args, **kwargs):
+        """Queue a call of func(*args) on a board, eg. for gpib.dev().
+
+        Args:
+            board (int): board index
+            func (callable): function to call
+            *args: arguments to func
+            priority (int): keyword only, default NORMAL
+
+        Returns:
+            concurrent.futures.Future: resolves to the return value of func
+        """
+
+        priority = kwargs.pop('priority', NORMAL)
+        if kwargs:
+            raise TypeError("unexpected keyword arguments: {:s}".format(
+                ", ".join(sorted(kwargs))))
+
+        scheduler = self.scheduler(board)
+        # BoardScheduler.submit takes the first argument as the handle whose
+        # operations are kept in order, so pass the handle explicitly
+        return scheduler._submit(priority, _handle_of(func, args), func,
+                                 *args)
+
+    def submit_batch(self, ops, priority=NORMAL):
+        """Queue a batch of operations, each on the board of its handle.
+
+        Args:
+            ops (iterable): tuples of a function and its arguments
+            priority (int): default NORMAL
+
+        Returns:
+            list: concurrent.futures.Future of each operation, in order
+        """
+
+        return [self.submit(op[0], *op[1:], priority=priority) for op in ops]
+
+    def gather(self, ops, timeout=None, priority=NORMAL):
+        """Run a batch of operations and wait for all of them.
+
+        Args:
+            ops (iterable): tuples of a function and its arguments
+            timeout (float): seconds to wait for all results, default None
+                meaning no limit
+            priority (int): default NORMAL
+
+        Returns:
+            list: return values of the operations, in order. The first
+                exception raised by an operation, in order, is raised after
+                all operations have completed.
+        """
+
+        futures = self.submit_batch(ops, priority)
+        done, pending = concurrent.futures.wait(futures, timeout)
+        if pending:
+            raise concurrent.futures.TimeoutError(
+                "{:d} of {:d} operations not completed".format(
+                    len(pending), len(futures)))
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        """Stop all board workers after the queued operations have run.
+
+        Args:
+            wait (bool): block until the workers have exited, default True
+        """
+
+        with self._lock:
+            self._stopping = True
+            schedulers = list(self._schedulers.values())
+            self._schedulers.clear()
+        for scheduler in schedulers:
+            scheduler.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
+def _handle_of(func, args):
+    """Get the handle an operation acts on, or None."""
+
+    handle = getattr(getattr(func, '__self__', None), 'id', None)
+    if not isinstance(handle, int):
+        handle = args[0] if args else None
+    return handle if isinstance(handle, int) else None
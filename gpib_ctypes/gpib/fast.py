@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+"""Low overhead versions of the frequently called gpib functions.
+
+The functions below call their own instances of the library functions,
+which check ibsta in a ctypes errcheck function and read ibcntl and iberr
+directly, from ThreadIbcntl() and ThreadIberr() or from global variables
+looked up once. Simple calls like trigger() and wait() are the library
+functions themselves, without a Python wrapper. All other names are those
+of gpib_ctypes.gpib. Example usage:
+
+from gpib_ctypes.gpib import fast as gpib
+
+handle = gpib.dev(0, 23)
+while not gpib.serial_poll(handle) & gpib.IbStbMAV:
+    pass
+
+Return values, GpibError and last_status() are as for gpib_ctypes.gpib,
+but calls are not reported to the observer of gpib_ctypes.gpib.metrics.
+The functions are bound on the first call. Call bind() again after loading
+another library with gpib._load_lib(). If the loaded library is not a
+shared library, eg. the simulated one, the gpib_ctypes.gpib functions are
+used instead.
+"""
+
+import ctypes
+
+from .constants import *
+from . import gpib as _gpib
+from .gpib import (
+    addressed_read,
+    addressed_write,
+    as_completed,
+    board_index,
+    clear_list,
+    dev,
+    find,
+    find_listeners,
+    ibcnt,
+    ibsta,
+    last_status,
+    iter_read,
+    lines,
+    listener,
+    local_list,
+    parallel_poll_addresses,
+    parallel_poll_config,
+    parallel_poll_setup,
+    parallel_poll_unconfig,
+    query,
+    query_many,
+    read_block,
+    remote_list,
+    serial_poll_many,
+    set_addressing,
+    set_read_pool,
+    spoll_bytes,
+    start_read,
+    start_write,
+    trigger_list,
+    version,
+    write_async,
+    write_broadcast,
+    AsyncTransfer,
+    GpibError,
+    IbStatus)
+
+# functions replaced by bind()
+_FAST_FUNCTIONS = ('ask', 'clear', 'close', 'command', 'config', 'ibloc',
+                   'interface_clear', 'parallel_poll', 'read', 'read_into',
+                   'remote_enable', 'serial_poll', 'stop', 'timeout',
+                   'trigger', 'wait', 'write')
+
+
+def _status_readers(lib):
+    """Get functions reading iberr and ibcntl after a call."""
+
+    if _gpib._status_lock is None:
+        return lib.ThreadIberr, lib.ThreadIbcntl
+
+    iberr = ctypes.c_int.in_dll(lib, "iberr")
+    ibcntl = ctypes.c_long.in_dll(lib, "ibcntl")
+    return (lambda: iberr.value), (lambda: ibcntl.value)
+
+
+def _errcheck(funcname, get_err, get_cnt, result):
+    """Make an errcheck function raising GpibError like gpib_ctypes.gpib
+    and returning ibsta, or result(cnt, args) if given.
+    """
+
+    local = _gpib._local
+    new = tuple.__new__  # skips the Python level IbStatus.__new__
+
+    if result is None:
+        def errcheck(sta, func, args):
+            cnt = get_cnt()
+            if sta & ERR:
+                local.status = status = IbStatus(sta, get_err(), cnt)
+                raise GpibError(funcname, status)
+            local.status = new(IbStatus, (sta, 0, cnt))
+            return sta
+    else:
+        def errcheck(sta, func, args):
+            cnt = get_cnt()
+            if sta & ERR:
+                local.status = status = IbStatus(sta, get_err(), cnt)
+                raise GpibError(funcname, status)
+            local.status = new(IbStatus, (sta, 0, cnt))
+            return result(cnt, args)
+    return errcheck
+
+
+def _data(cnt, args):
+    return args[1][:cnt]
+
+
+def _status_byte(cnt, args):
+    return ord(args[1]._obj.value)
+
+
+def _value(cnt, args):
+    return args[2]._obj.value
+
+
+def bind():
+    """Bind the fast functions to the loaded library, loading it if
+    necessary.
+    """
+
+    lib = _gpib._lib
+    if isinstance(lib, _gpib._LazyLibrary):
+        lib = lib._load()
+
+    if not isinstance(lib, ctypes.CDLL):
+        namespace = dict((name, getattr(_gpib, name))
+                         for name in _FAST_FUNCTIONS)
+        globals().update(namespace)
+        return
+
+    get_err, get_cnt = _status_readers(lib)
+
+    def function(name, funcname, result=None):
+        # arguments are converted by ctypes' defaults, as for the functions
+        # of gpib_ctypes.gpib, which is cheaper than converting by argtypes
+        func = lib._FuncPtr((name, lib))
+        func.restype = ctypes.c_int
+        func.__name__ = funcname
+        func.errcheck = _errcheck(funcname, get_err, get_cnt, result)
+        return func
+
+    ibask = function("ibask", "ask", _value)
+    ibcmd = function("ibcmd", "command")
+    ibconfig = function("ibconfig", "config")
+    ibonl = function("ibonl", "close")
+    ibrd = function("ibrd", "read", _data)
+    ibrd_into = function("ibrd", "read_into")
+    ibrpp = function("ibrpp", "parallel_poll", _status_byte)
+    ibrsp = function("ibrsp", "serial_poll", _status_byte)
+    ibwrt = function("ibwrt", "write")
+    create_buffer = ctypes.create_string_buffer
+    buffer_view = _gpib._buffer_view
+    local = _gpib._local
+    c_char, c_int, byref = ctypes.c_char, ctypes.c_int, ctypes.byref
+
+    def ask(handle, conf):
+        return ibask(handle, conf, byref(c_int()))
+
+    board_addresses = _gpib._board_addresses
+    transfers = _gpib._transfers
+
+    def close(handle):
+        board_addresses.pop(handle, None)
+        transfers.pop(handle, None)
+        return ibonl(handle, 0)
+
+    def command(handle, cmd):
+        return ibcmd(handle, cmd, len(cmd))
+
+    def config(handle, conf, value):
+        # like gpib.config(), forget the cached address of a board
+        if conf in (IbcPAD, IbcSAD):
+            board_addresses.pop(handle, None)
+        return ibconfig(handle, conf, value)
+
+    def parallel_poll(board):
+        return ibrpp(board, byref(c_char()))
+
+    def read(handle, length):
+        return ibrd(handle, create_buffer(length), length)
+
+    def read_into(handle, buf, offset=0, nbytes=None):
+        target = buffer_view(buf, offset, nbytes)
+        ibrd_into(handle, target, len(target))
+        return local.status.cnt
+
+    def serial_poll(handle):
+        return ibrsp(handle, byref(c_char()))
+
+    def write(handle, data):
+        return ibwrt(handle, data, len(data))
+
+    namespace = {
+        'ask': ask,
+        'clear': function("ibclr", "clear"),
+        'close': close,
+        'command': command,
+        'config': config,
+        'ibloc': function("ibloc", "ibloc"),
+        'interface_clear': function("ibsic", "interface_clear"),
+        'parallel_poll': parallel_poll,
+        'read': read,
+        'read_into': read_into,
+        'remote_enable': function("ibsre", "remote_enable"),
+        'serial_poll': serial_poll,
+        'stop': function("ibstop", "stop"),
+        'timeout': function("ibtmo", "timeout"),
+        'trigger': function("ibtrg", "trigger"),
+        'wait': function("ibwait", "wait"),
+        'write': write,
+    }
+
+    lock = _gpib._status_lock
+    if lock is not None:
+        # only global status variables: serialize calls with reading them
+        # like gpib_ctypes.gpib does
+        for name, func in namespace.items():
+            namespace[name] = _locked(func, lock)
+
+    globals().update(namespace)
+
+
+def _locked(func, lock):
+    def locked(*args, **kwargs):
+        with lock:
+            return func(*args, **kwargs)
+    locked.__name__ = getattr(func, '__name__', 'locked')
+    return locked
+
+
+def _unbound(name):
+    def unbound(*args, **kwargs):
+        bind()
+        return globals()[name](*args, **kwargs)
+    unbound.__name__ = name
+    unbound.__doc__ = getattr(_gpib, name).__doc__
+    return unbound
+
+
+for _name in _FAST_FUNCTIONS:
+    globals()[_name] = _unbound(_name)
+del _name
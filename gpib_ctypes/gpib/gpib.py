@@ -1,29 +1,132 @@
 # -*- coding: utf-8 -*-
 
+import collections
 import ctypes
 import os
 import sys
 import platform
+import threading
+import time
 
 from .constants import *
+from . import commands
+from .commands import _split_address
 
-# load the GPIB dynamic library using ctypes
+# the GPIB dynamic library loaded using ctypes, see _load_lib()
 _lib = None
+_load_lock = threading.RLock()
 
+# names of optional library functions which were found and bound
+_extensions = set()
 
-def _load_lib(filename=None):
+# optional NI-488.2 multi-device routines and their argument types
+_addrlist = ctypes.POINTER(ctypes.c_ushort)
+_OPTIONAL_FUNCTIONS = (
+    ("AllSpoll", [ctypes.c_int, _addrlist, ctypes.POINTER(ctypes.c_short)]),
+    ("FindLstn", [ctypes.c_int, _addrlist, _addrlist, ctypes.c_int]),
+    ("TriggerList", [ctypes.c_int, _addrlist]),
+    ("DevClearList", [ctypes.c_int, _addrlist]),
+    ("EnableLocal", [ctypes.c_int, _addrlist]),
+    ("EnableRemote", [ctypes.c_int, _addrlist]),
+    ("SendList", [ctypes.c_int, _addrlist, ctypes.c_void_p, ctypes.c_long,
+                  ctypes.c_int]),
+)
+
+# serializes library calls with reading their status when the library
+# only provides the ibsta, iberr and ibcntl global variables
+_status_lock = None
+
+# status of the last library call made by each thread
+_local = threading.local()
+
+# callable(func, args, status, seconds) notified after every library call,
+# see metrics.enable()
+_observer = None
+_clock = getattr(time, 'perf_counter', time.time)
+
+# optional BufferPool serving read() buffers, see set_read_pool()
+_read_pool = None
+
+# handle -> AsyncTransfer in progress, keeps its buffer alive
+_transfers = {}
+
+# board handle -> (pad, sad) address of the board, see _board_address()
+_board_addresses = {}
+
+
+def _load_lib(filename=None, trace=None):
     """Attempt to load the GPIB library from the given filename.
-    If filename is ommitted, try several likely paths.
+    If filename is ommitted, use the GPIB_CTYPES_LIBRARY environment
+    variable or else try the library found last time and several likely
+    paths. The name of the library found is cached for later processes.
+
+    The module loads the library by calling this function without arguments
+    on the first GPIB call, unless it has been called before.
+
+    A filename of the form "replay:<path>" loads no library but replays
+    the calls recorded in a trace file, see gpib_ctypes.gpib.trace, and
+    "sim:<path>" loads a simulated library configured by a JSON file, see
+    gpib_ctypes.gpib.sim.
 
     Args:
         filename (str): path to GPIB library, default None
+        trace (str): path of a trace file to record all library calls to,
+            default None, not allowed with "replay:<path>"
 
     Returns:
         bool: library found and loaded
     """
 
-    global _lib
-    _lib = None
+    global _lib, _status_lock, _extensions
+    with _load_lock:
+        lib, status_lock, extensions, found = _open_lib(filename, trace)
+        _board_addresses.clear()
+        previous = _lib
+        # publish the fully bound library last, for other threads
+        _extensions = extensions
+        _status_lock = status_lock
+        _lib = lib
+        from .trace import TracingLibrary
+        if isinstance(previous, TracingLibrary):
+            # finish the trace file of the replaced library
+            previous.close()
+    return found
+
+
+def _open_lib(filename, trace):
+    """Load and bind the library for _load_lib().
+
+    Returns:
+        tuple: (library, status lock or None, names of bound optional
+            functions, whether the library was found)
+    """
+
+    lib = None
+    status_lock = None
+    extensions = set()
+
+    if not filename:
+        filename = os.environ.get("GPIB_CTYPES_LIBRARY")
+    cached = None if filename else _read_cached_libname()
+
+    if filename and filename.startswith("replay:"):
+        if trace:
+            raise ValueError("_load_lib() error: cannot trace a replayed "
+                             "session")
+        from .trace import ReplayLibrary
+        lib = ReplayLibrary(filename[len("replay:"):])
+        # the recorded session called the optional functions it found
+        extensions = set(name for name, argtypes in _OPTIONAL_FUNCTIONS
+                         if name in lib.functions())
+        return lib, status_lock, extensions, True
+
+    if filename and filename.startswith("sim:"):
+        from .sim import SimulatedLibrary
+        lib = SimulatedLibrary.from_file(filename[len("sim:"):])
+        if trace:
+            from .trace import TracingLibrary
+            lib = TracingLibrary(lib, trace)
+        return lib, status_lock, extensions, True
 
     if platform.system() == "Windows":
         libnames = [filename] if filename else \
@@ -37,20 +140,25 @@ def _load_lib(filename=None):
         # most likely Linux with linux-gpib
         libnames = [filename] if filename else ['libgpib.so.0', 'gpib-32.so']
         loader = ctypes.cdll.LoadLibrary
+    if cached:
+        libnames.insert(0, cached)
 
     for libname in libnames:
         try:
-            _lib = loader(libname)
+            lib = loader(libname)
             break
         except OSError:
             continue
 
-    if not _lib:
+    if not lib:
         # Warn the user but still load the module.
         # This is necessary for eg. docs generators to work without having
         # GPIB installed.
         import warnings
-        message = "GPIB library not found. Please manually load it using _load_lib(filename). All GPIB functions will raise OSError until the library is manually loaded."
+        message = ("GPIB library not found. Please manually load it using "
+                   "_load_lib(filename) or set GPIB_CTYPES_LIBRARY. All GPIB "
+                   "functions will raise OSError until the library is "
+                   "manually loaded.")
         warnings.warn(message)
 
         class MockGPIB(object):
@@ -59,8 +167,11 @@ def _load_lib(filename=None):
                     raise OSError(message)
                 return f
 
-        _lib = MockGPIB()
-        return False
+        lib = MockGPIB()
+        return lib, status_lock, extensions, False
+
+    if not filename and libname != cached:
+        _write_cached_libname(libname)
 
     # prepare ctypes bindings
     for name, argtypes, restype in (
@@ -75,10 +186,15 @@ def _load_lib(filename=None):
                   ctypes.POINTER(ctypes.c_short)], ctypes.c_int),
         ("ibloc", [ctypes.c_int], ctypes.c_int),
         ("ibonl", [ctypes.c_int, ctypes.c_int], ctypes.c_int),
+        ("ibppc", [ctypes.c_int, ctypes.c_int], ctypes.c_int),
         ("ibrd", [ctypes.c_int, ctypes.c_char_p, ctypes.c_long], ctypes.c_int),
+        ("ibrda", [ctypes.c_int, ctypes.c_char_p,
+                   ctypes.c_long], ctypes.c_int),
+        ("ibrpp", [ctypes.c_int, ctypes.c_char_p], ctypes.c_int),
         ("ibrsp", [ctypes.c_int, ctypes.c_char_p], ctypes.c_int),
         ("ibsic", [ctypes.c_int], ctypes.c_int),
         ("ibsre", [ctypes.c_int, ctypes.c_int], ctypes.c_int),
+        ("ibstop", [ctypes.c_int], ctypes.c_int),
         ("ibtmo", [ctypes.c_int, ctypes.c_int], ctypes.c_int),
         ("ibtrg", [ctypes.c_int], ctypes.c_int),
         ("ibwait", [ctypes.c_int, ctypes.c_int], ctypes.c_int),
@@ -88,64 +204,231 @@ def _load_lib(filename=None):
         ("iblines", [ctypes.c_int, ctypes.POINTER(
             ctypes.c_short)], ctypes.c_int)
     ):
-        libfunction = _lib[name]
+        libfunction = lib[name]
         libfunction.argtypes = argtypes
         libfunction.restype = restype
 
     # implementation-specific special cases
     try:
-        _old_ibfind = _lib.ibfind
+        _old_ibfind = lib.ibfind
         _old_ibfind.argtypes = [ctypes.c_char_p]
         _old_ibfind.restype = ctypes.c_int
-        setattr(_lib, "ibfind", lambda name: _old_ibfind(name.encode('ascii')))
+
+        def ibfind(name):
+            return _old_ibfind(name.encode('ascii'))
+        setattr(lib, "ibfind", ibfind)
     except AttributeError:
         # Windows Unicode version ibfindW
-        _lib.ibfindW.argtypes = [ctypes.c_wchar_p]
-        _lib.ibfindW.restype = ctypes.c_int
-        setattr(_lib, "ibfind", _lib.ibfindW)
+        lib.ibfindW.argtypes = [ctypes.c_wchar_p]
+        lib.ibfindW.restype = ctypes.c_int
+        setattr(lib, "ibfind", lib.ibfindW)
 
     try:
-        _lib.ibspb.argtypes = [ctypes.c_int, ctypes.POINTER(ctypes.c_short)]
-        _lib.ibspb.restype = ctypes.c_int
+        lib.ibspb.argtypes = [ctypes.c_int, ctypes.POINTER(ctypes.c_short)]
+        lib.ibspb.restype = ctypes.c_int
     except AttributeError:
         # some Windows GPIB libraries do not provide ibsp
         # but maybe it is not needed, so gently warn the user it is missing
         import warnings
         message = "{:s} does not implement ibspb() on this platform.".format(
-            _lib._name)
+            lib._name)
         warnings.warn(message, ImportWarning)
 
         def _ibspb(*args):
             raise NotImplementedError(message)
-        setattr(_lib, "ibspb", _ibspb)
+        setattr(lib, "ibspb", _ibspb)
+
+    for name, argtypes in _OPTIONAL_FUNCTIONS:
+        try:
+            libfunction = lib[name]
+        except AttributeError:
+            continue
+        libfunction.argtypes = argtypes
+        libfunction.restype = None
+        extensions.add(name)
 
     try:
-        _lib.ThreadIbsta.restype = ctypes.c_int
-        setattr(_lib, "getibsta", _lib.ThreadIbsta)
+        lib.ThreadIbsta.restype = ctypes.c_int
+        setattr(lib, "getibsta", lib.ThreadIbsta)
     except AttributeError:
-        setattr(_lib, "getibsta", lambda: ctypes.c_int.in_dll(_lib, "ibsta"))
+        setattr(lib, "getibsta", _global_status(lib, ctypes.c_int, "ibsta"))
+        status_lock = threading.Lock()
 
     try:
-        _lib.ThreadIbcntl.restype = ctypes.c_long
-        setattr(_lib, "getibcntl", _lib.ThreadIbcntl)
+        lib.ThreadIbcntl.restype = ctypes.c_long
+        setattr(lib, "getibcntl", lib.ThreadIbcntl)
     except AttributeError:
-        setattr(_lib, "getibcntl", lambda: ctypes.c_long.in_dll(_lib, "ibcntl"))
+        setattr(lib, "getibcntl", _global_status(lib, ctypes.c_long, "ibcntl"))
+        status_lock = threading.Lock()
 
     try:
-        _lib.ThreadIberr.restype = ctypes.c_int
-        setattr(_lib, "getiberr", _lib.ThreadIberr)
+        lib.ThreadIberr.restype = ctypes.c_int
+        setattr(lib, "getiberr", lib.ThreadIberr)
     except AttributeError:
-        setattr(_lib, "getiberr", lambda: ctypes.c_int.in_dll(_lib, "iberr"))
+        setattr(lib, "getiberr", _global_status(lib, ctypes.c_int, "iberr"))
+        status_lock = threading.Lock()
+
+    if trace:
+        from .trace import TracingLibrary
+        lib = TracingLibrary(lib, trace)
+
+    return lib, status_lock, extensions, True
+
+
+def _global_status(lib, ctype, name):
+    """Make a getter of a status global variable, looking it up once."""
+
+    try:
+        variable = ctype.in_dll(lib, name)
+    except ValueError:
+        # not exported, fail when it is needed
+        return lambda: ctype.in_dll(lib, name).value
+    return lambda: variable.value
 
-    return True
 
+def _cache_path():
+    """Path of the file caching the name of the library found by probing."""
 
-_load_lib()
+    if platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or \
+            os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "gpib_ctypes", "library")
+
+
+def _read_cached_libname():
+    try:
+        with open(_cache_path()) as f:
+            return f.read().strip() or None
+    except (IOError, OSError):
+        return None
+
+
+def _write_cached_libname(libname):
+    path = _cache_path()
+    temp = "{:s}.{:d}".format(path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(temp, "w") as f:
+            f.write(libname + "\n")
+        getattr(os, "replace", os.rename)(temp, path)
+    except (IOError, OSError):
+        # the cache only saves time
+        pass
+
+
+class _LazyLibrary(object):
+    """Stands in for the library until the first GPIB call loads it."""
+
+    def _load(self):
+        with _load_lock:
+            if _lib is self:
+                _load_lib()
+        return _lib
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+def _has_extension(name):
+    """Check whether the optional library function name was bound."""
+
+    if isinstance(_lib, _LazyLibrary):
+        _lib._load()
+    return name in _extensions
+
+
+_lib = _LazyLibrary()
+
+
+class IbStatus(collections.namedtuple('IbStatus', ['sta', 'err', 'cnt'])):
+    """Status of one library call: ibsta, iberr and ibcntl values.
+    iberr is 0 unless ERR is set in ibsta.
+    """
+
+    __slots__ = ()
+
+
+def _call(func, *args):
+    """Call a library function which returns ibsta and capture its status.
+
+    Returns:
+        IbStatus: status of the call
+    """
+
+    return _call_on(_lib, True, func, *args)[1]
+
+
+def _call_ret(func, *args):
+    """Call a library function which does not return ibsta, such as ibdev,
+    and capture its status.
+
+    Returns:
+        tuple: return value of the function and IbStatus of the call
+    """
+
+    return _call_on(_lib, False, func, *args)
+
+
+def _call_on(lib, returns_sta, func, *args):
+    """Call a function of lib and capture its status through the status
+    functions of lib. The status is kept as the calling thread's last
+    status and reported to the observer.
+
+    Args:
+        lib: library providing getibsta, getiberr and getibcntl
+        returns_sta (bool): func returns ibsta, else ibsta is read with
+            getibsta
+        func (callable): function to call
+        *args: arguments to func
+
+    Returns:
+        tuple: return value of the function and IbStatus of the call
+    """
+
+    observer = _observer
+    if observer is not None:
+        start = _clock()
+
+    lock = _status_lock
+    if lock is None:
+        ret = func(*args)
+        sta = ret if returns_sta else lib.getibsta()
+        status = IbStatus(sta, lib.getiberr() if sta & ERR else 0,
+                          lib.getibcntl())
+    else:
+        with lock:
+            ret = func(*args)
+            sta = ret if returns_sta else lib.getibsta()
+            status = IbStatus(sta, lib.getiberr() if sta & ERR else 0,
+                              lib.getibcntl())
+
+    _local.status = status
+    if observer is not None:
+        observer(func, args, status, _clock() - start)
+    return ret, status
+
+
+def last_status():
+    """Get the status of the last library call made by the calling thread
+    through this module. Unlike ibsta() and ibcnt(), it is never affected
+    by calls in other threads.
+
+    Returns:
+        IbStatus: status of the last call, or None if there was none
+    """
+
+    return getattr(_local, 'status', None)
 
 
 class GpibError(Exception):
     """Exception class with helpful GPIB error messages
-       GpibError(gpib_function_name)
+       GpibError(gpib_function_name[, status])
+
+    The IbStatus of the failed call is available as the status attribute.
+    If not given, the status of the calling thread's last call is used.
     """
 
     _explanation = {
@@ -173,12 +456,17 @@ class GpibError(Exception):
         EPWR: "interface lost power"
     }
 
-    def __init__(self, funcname):
-        self.code = _lib.getiberr()
+    def __init__(self, funcname, status=None):
+        if status is None:
+            status = last_status()
+            if status is None or not status.sta & ERR:
+                status = IbStatus(ibsta(), _lib.getiberr(), ibcnt())
+        self.status = status
+        self.code = status.err
         self.sverrno = None
 
         if self.code in (EDVR, EFSO):
-            self.sverrno = ibcnt()
+            self.sverrno = status.cnt
             message = "{:s}() error: Errno {:d}, {:s}".format(
                 funcname, self.sverrno, os.strerror(self.sverrno))
         else:
@@ -192,6 +480,221 @@ class GpibError(Exception):
         super(GpibError, self).__init__(message)
 
 
+class AsyncTransfer(object):
+    """Asynchronous read or write in progress, as returned by start_read()
+    and start_write(). The transfer buffer is kept alive until the transfer
+    completes or is cancelled.
+
+    Only one asynchronous transfer may be in progress per handle.
+    """
+
+    def __init__(self, handle, buf, funcname):
+        self.handle = handle
+        self.funcname = funcname
+        self.sta = None        # ibsta after starting, then after completion
+        self.count = None      # number of bytes transferred
+        self.cancelled = False
+        self._buf = buf
+        self._done = False
+        self._error = None
+
+    def __repr__(self):
+        state = "done" if self._done else "pending"
+        return "<{:s} {:s}({:d}) {:s}>".format(
+            self.__class__.__name__, self.funcname, self.handle, state)
+
+    def _finish(self, status):
+        self._done = True
+        self.sta = status.sta
+        self.count = status.cnt
+        if status.sta & ERR:
+            self._error = GpibError(self.funcname, status)
+        if _transfers.get(self.handle) is self:
+            del _transfers[self.handle]
+
+    def done(self):
+        """Check whether the transfer has completed by calling ibwait
+        without waiting.
+
+        Returns:
+            bool: True if the transfer completed or was cancelled
+        """
+
+        if not self._done:
+            status = _call(_lib.ibwait, self.handle, 0)
+            if status.sta & (CMPL | ERR):
+                self._finish(status)
+        return self._done
+
+    def result(self, timeout=None):
+        """Wait for the transfer to complete by calling ibwait with CMPL.
+
+        Args:
+            timeout (float): maximum time to wait in seconds, default None
+                meaning wait without a limit
+
+        Returns:
+            bytes: sequence of bytes which was read, for reads
+            int: number of bytes written, for writes
+        """
+
+        if not self._done:
+            if timeout is None:
+                self._finish(_call(_lib.ibwait, self.handle, CMPL))
+            else:
+                deadline = time.time() + timeout
+                while not self.done():
+                    if time.time() >= deadline:
+                        raise TimeoutError(
+                            "{:s}() transfer not completed within {:g} "
+                            "s".format(self.funcname, timeout))
+                    time.sleep(_poll_interval)
+
+        if self._error is not None:
+            raise self._error
+        if self.funcname == "start_read":
+            return self._buf[:self.count]
+        return self.count
+
+    def cancel(self):
+        """Abort the transfer by calling ibstop.
+
+        Returns:
+            bool: True if the transfer was cancelled, False if it had
+                already completed
+        """
+
+        if self.done():
+            return False
+
+        stop(self.handle)
+        self._finish(_call(_lib.ibwait, self.handle, CMPL))
+        self.cancelled = True
+        return True
+
+
+def addressed_read(board, talker, length, listeners=(), readdress=True):
+    """Read data bytes from a device through the board, addressing the
+    device to talk and the board to listen with one command() and reading
+    with ibrd on the board.
+
+    Devices in listeners receive the same data bytes in the same bus
+    cycles, which copies data from the talker to them in one transfer.
+    The board always takes part as a listener: transfers between devices
+    without the board, which need the board to release ATN with ibgts and
+    optionally shadow handshake, are not supported.
+
+    The board address is looked up with ibask once per board handle and
+    cached until the handle is closed or its address changed with config().
+
+    Args:
+        board (int): board handle
+        talker (int or tuple): talker address, a primary address or a
+            (pad, sad) tuple
+        length (int): maximum number of bytes to read
+        listeners (iterable): addresses of other listeners, default ()
+        readdress (bool): address the bus first, default True. Pass False
+            when the bus is still addressed by the previous call.
+
+    Returns:
+        bytes: the bytes read
+    """
+
+    if readdress:
+        command(board, commands.address(
+            talker, (_board_address(board),) + tuple(listeners)))
+    return read(board, length)
+
+
+def addressed_write(board, listeners, data, readdress=True):
+    """Write data bytes to devices through the board, addressing the board
+    to talk and the devices to listen with one command() and writing with
+    ibwrt on the board.
+
+    Args:
+        board (int): board handle
+        listeners (iterable): listener addresses, each a primary address or
+            a (pad, sad) tuple
+        data (bytes): sequence of bytes to write
+        readdress (bool): address the bus first, default True. Pass False
+            when the bus is still addressed by the previous call.
+
+    Returns:
+        int: ibsta value
+    """
+
+    if readdress:
+        command(board, commands.address(_board_address(board), listeners))
+    return write(board, data)
+
+
+# seconds between ibwait polls of transfers with a timeout
+_poll_interval = 0.001
+
+try:
+    TimeoutError = TimeoutError
+except NameError:
+    # Python 2
+    class TimeoutError(OSError):
+        """Raised when transfers do not complete within their timeout."""
+
+
+def as_completed(transfers, timeout=None):
+    """Poll many asynchronous transfers and yield them as they complete.
+
+    Args:
+        transfers (iterable of AsyncTransfer): transfers to poll
+        timeout (float): maximum time to wait in seconds, default None
+            meaning wait without a limit
+
+    Yields:
+        AsyncTransfer: next completed transfer
+    """
+
+    pending = list(transfers)
+    deadline = None if timeout is None else time.time() + timeout
+
+    while pending:
+        still_pending = []
+        for transfer in pending:
+            if transfer.done():
+                yield transfer
+            else:
+                still_pending.append(transfer)
+        pending = still_pending
+        if pending:
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(
+                    "{:d} transfers not completed within {:g} s".format(
+                        len(pending), timeout))
+            time.sleep(_poll_interval)
+
+
+def _buffer_view(buf, offset=0, nbytes=None):
+    """Map a region of a writable buffer onto a ctypes char array which
+    shares its memory, so it can be passed to the library directly.
+
+    Args:
+        buf: writable object supporting the buffer protocol
+        offset (int): byte position of the region in buf
+        nbytes (int): size of the region, default None meaning up to the
+            end of buf
+
+    Returns:
+        ctypes.Array: char array sharing memory with buf
+    """
+
+    size = memoryview(buf).nbytes
+    if nbytes is None:
+        nbytes = size - offset
+    if offset < 0 or nbytes < 0 or offset + nbytes > size:
+        raise ValueError(
+            "region of {:d} bytes at offset {:d} does not fit in a buffer of "
+            "{:d} bytes".format(nbytes, offset, size))
+
+    return (ctypes.c_char * nbytes).from_buffer(buf, offset)
+
+
 def ask(handle, conf):
     """Query configuration by calling ibask.
 
@@ -205,9 +708,33 @@ def ask(handle, conf):
 
     result = ctypes.c_int()
 
-    sta = _lib.ibask(handle, conf, ctypes.byref(result))
-    if sta & ERR:
-        raise GpibError("ask")
+    status = _call(_lib.ibask, handle, conf, ctypes.byref(result))
+    if status.sta & ERR:
+        raise GpibError("ask", status)
+
+    return result.value
+
+
+def board_index(handle):
+    """Get the index of the board through which a handle is accessed,
+    by calling ibask with IbaBNA for device handles. A board handle is
+    its own index.
+
+    Args:
+        handle (int): board or device handle
+
+    Returns:
+        int: board index
+    """
+
+    result = ctypes.c_int()
+
+    status = _call(_lib.ibask, handle, IbaBNA, ctypes.byref(result))
+    if status.sta & ERR:
+        if status.err == EARG:
+            # IbaBNA is only valid for device handles
+            return handle
+        raise GpibError("board_index", status)
 
     return result.value
 
@@ -222,11 +749,28 @@ def clear(handle):
         int: ibsta value
     """
 
-    sta = _lib.ibclr(handle)
-    if sta & ERR:
-        raise GpibError("clear")
+    status = _call(_lib.ibclr, handle)
+    if status.sta & ERR:
+        raise GpibError("clear", status)
 
-    return sta
+    return status.sta
+
+
+def clear_list(board, addresses):
+    """Clear many devices at once. Uses DevClearList where the library
+    provides it, otherwise a single sequence of command bytes (UNL, listen
+    addresses, SDC) on the board.
+
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple
+
+    Returns:
+        int: ibsta value
+    """
+
+    return _list_command(board, addresses, "DevClearList", SDC, "clear_list")
 
 
 def close(handle):
@@ -239,11 +783,14 @@ def close(handle):
         int: ibsta value
     """
 
-    sta = _lib.ibonl(handle, 0)
-    if sta & ERR:
-        raise GpibError("close")
+    _board_addresses.pop(handle, None)
+    # ibonl aborts a transfer in progress, release its buffer
+    _transfers.pop(handle, None)
+    status = _call(_lib.ibonl, handle, 0)
+    if status.sta & ERR:
+        raise GpibError("close", status)
 
-    return sta
+    return status.sta
 
 
 def command(handle, cmd):
@@ -257,11 +804,11 @@ def command(handle, cmd):
         int: ibsta value
     """
 
-    sta = _lib.ibcmd(handle, cmd, len(cmd))
-    if sta & ERR:
-        raise GpibError("command")
+    status = _call(_lib.ibcmd, handle, cmd, len(cmd))
+    if status.sta & ERR:
+        raise GpibError("command", status)
 
-    return sta
+    return status.sta
 
 
 def config(handle, conf, value):
@@ -276,11 +823,13 @@ def config(handle, conf, value):
         int: ibsta value
     """
 
-    sta = _lib.ibconfig(handle, conf, value)
-    if sta & ERR:
-        raise GpibError("config")
+    if conf in (IbcPAD, IbcSAD):
+        _board_addresses.pop(handle, None)
+    status = _call(_lib.ibconfig, handle, conf, value)
+    if status.sta & ERR:
+        raise GpibError("config", status)
 
-    return sta
+    return status.sta
 
 
 def dev(board, pad, sad=NO_SAD, tmo=T30s, sendeoi=1, eos=0):
@@ -298,9 +847,9 @@ def dev(board, pad, sad=NO_SAD, tmo=T30s, sendeoi=1, eos=0):
         int: board or device handle
     """
 
-    ud = _lib.ibdev(board, pad, sad, tmo, sendeoi, eos)
+    ud, status = _call_ret(_lib.ibdev, board, pad, sad, tmo, sendeoi, eos)
     if ud < 0:
-        raise GpibError("dev")
+        raise GpibError("dev", status)
     return ud
 
 
@@ -314,14 +863,74 @@ def find(name):
     Returns:
         int: board or device handle
     """
-    ud = _lib.ibfind(name)
+    ud, status = _call_ret(_lib.ibfind, name)
     if ud < 0:
-        raise GpibError("find")
+        raise GpibError("find", status)
     return ud
 
 
+def find_listeners(board, pads=range(31), include_secondary=False,
+                   tmo=T10ms):
+    """Find all listeners on the bus in one call. Uses FindLstn where the
+    library provides it, otherwise checks each address with ibln using a
+    short board timeout, which is restored afterwards.
+
+    Args:
+        board (int): board handle
+        pads (iterable): primary addresses to check, default 0 to 30
+        include_secondary (bool): also look for listeners at secondary
+            addresses of primary addresses without a listener, default False
+        tmo (int): board timeout constant used during the scan,
+            default gpib.T10ms
+
+    Returns:
+        list: addresses of listeners, each either a primary address or
+            a (pad, sad) tuple
+    """
+
+    own_pad = ask(board, IbaPAD)
+    pads = [pad for pad in pads if pad != own_pad]
+    if not pads:
+        return []
+
+    if _has_extension("FindLstn"):
+        padlist = _address_list(pads)
+        # FindLstn reports each secondary address it finds at a primary
+        # address without a listener, up to 31 per primary address, so
+        # size the result list for all of them and filter afterwards
+        limit = 31 * len(pads)
+        results = (ctypes.c_ushort * limit)()
+        status = _call_ret(_lib.FindLstn, board, padlist, results, limit)[1]
+        if status.sta & ERR:
+            raise GpibError("find_listeners", status)
+        found = []
+        for addr in results[:status.cnt]:
+            pad, sad = addr & 0xff, addr >> 8
+            if sad == NO_SAD:
+                found.append(pad)
+            elif include_secondary:
+                found.append((pad, sad))
+        return found
+
+    saved_tmo = ask(board, IbaTMO)
+    timeout(board, tmo)
+    try:
+        found = []
+        for pad in pads:
+            if listener(board, pad):
+                found.append(pad)
+            elif include_secondary and listener(board, pad, ALL_SAD):
+                found.extend((pad, sad) for sad in range(SAD, SAD + 31)
+                             if listener(board, pad, sad))
+        return found
+    finally:
+        timeout(board, saved_tmo)
+
+
 def ibcnt():
-    """Get number of transferred bytes by calling ThreadIbcntl or reading ibcnt.
+    """Get transferred byte count by calling ThreadIbcntl or reading ibcnt.
+    Without ThreadIbcntl, the value captured after the calling thread's last
+    call is returned instead, as other threads may have changed ibcnt since.
 
     Args:
         none
@@ -330,9 +939,42 @@ def ibcnt():
         int: number of transferred bytes
     """
 
+    if _status_lock is not None:
+        status = last_status()
+        if status is not None:
+            return status.cnt
+        with _status_lock:
+            return _lib.getibcntl()
+
     return _lib.getibcntl()
 
 
+def iter_read(handle, chunk_size=65536):
+    """Read a message of any length in chunks by calling ibrd repeatedly
+    until END is set in ibsta.
+
+    All chunks are read into the same buffer, so each yielded memoryview
+    is only valid until the next chunk is requested. Copy it with bytes()
+    to keep the data.
+
+    Args:
+        handle (int): board or device handle
+        chunk_size (int): maximum number of bytes per chunk, default 65536
+
+    Yields:
+        memoryview: bytes read by one ibrd call
+    """
+
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+
+    while True:
+        sta, count = _read_into(handle, buf, 0, chunk_size, "iter_read")
+        yield view[:count]
+        if sta & END:
+            break
+
+
 def ibloc(handle):
     """Push device to local mode by calling ibloc.
 
@@ -343,15 +985,17 @@ def ibloc(handle):
         int: ibsta value
     """
 
-    sta = _lib.ibloc(handle)
-    if sta & ERR:
-        raise GpibError("ibloc")
+    status = _call(_lib.ibloc, handle)
+    if status.sta & ERR:
+        raise GpibError("ibloc", status)
 
-    return sta
+    return status.sta
 
 
 def ibsta():
     """Get status value by calling ThreadIbsta or reading ibsta.
+    Without ThreadIbsta, the value captured after the calling thread's last
+    call is returned instead, as other threads may have changed ibsta since.
 
     Args:
         none
@@ -360,6 +1004,13 @@ def ibsta():
         int: ibsta value
     """
 
+    if _status_lock is not None:
+        status = last_status()
+        if status is not None:
+            return status.sta
+        with _status_lock:
+            return _lib.getibsta()
+
     return _lib.getibsta()
 
 
@@ -373,11 +1024,11 @@ def interface_clear(handle):
         int: ibsta value
     """
 
-    sta = _lib.ibsic(handle)
-    if sta & ERR:
-        raise GpibError("interface_clear")
+    status = _call(_lib.ibsic, handle)
+    if status.sta & ERR:
+        raise GpibError("interface_clear", status)
 
-    return sta
+    return status.sta
 
 
 def lines(board):
@@ -393,9 +1044,9 @@ def lines(board):
 
     result = ctypes.c_short()
 
-    sta = _lib.iblines(board, ctypes.byref(result))
-    if sta & ERR:
-        raise GpibError("lines")
+    status = _call(_lib.iblines, board, ctypes.byref(result))
+    if status.sta & ERR:
+        raise GpibError("lines", status)
 
     return result.value
 
@@ -414,13 +1065,279 @@ def listener(board, pad, sad=NO_SAD):
 
     present = ctypes.c_short()
 
-    sta = _lib.ibln(board, pad, sad, ctypes.byref(present))
-    if sta & ERR:
-        raise GpibError("listener")
+    status = _call(_lib.ibln, board, pad, sad, ctypes.byref(present))
+    if status.sta & ERR:
+        raise GpibError("listener", status)
 
     return bool(present)
 
 
+def local_list(board, addresses):
+    """Return many devices to local mode at once. Uses EnableLocal where
+    the library provides it, otherwise a single sequence of command bytes
+    (UNL, listen addresses, GTL) on the board.
+
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple
+
+    Returns:
+        int: ibsta value
+    """
+
+    return _list_command(board, addresses, "EnableLocal", GTL, "local_list")
+
+
+def parallel_poll(board):
+    """Conduct a parallel poll by calling ibrpp. Each configured device
+    answers on its data line in the same bus cycle.
+
+    Args:
+        board (int): board handle
+
+    Returns:
+        int: parallel poll response byte, bit 0 for DIO1 to bit 7 for DIO8
+    """
+
+    result = ctypes.c_char()
+
+    status = _call(_lib.ibrpp, board, ctypes.byref(result))
+    if status.sta & ERR:
+        raise GpibError("parallel_poll", status)
+
+    return ord(result.value)
+
+
+def parallel_poll_addresses(response, lines):
+    """Get the devices which answered a parallel poll.
+
+    Args:
+        response (int): parallel poll response byte
+        lines (dict): data line, 1 to 8 for DIO1 to DIO8, configured for
+            each device address, or None for devices which do not respond,
+            as taken by parallel_poll_setup()
+
+    Returns:
+        list: addresses of the devices whose line is asserted, in the order
+            of lines
+    """
+
+    return [addr for addr, line in lines.items()
+            if line is not None and response >> (line - 1) & 1]
+
+
+def parallel_poll_config(handle, line=None, sense=1):
+    """Configure the parallel poll response of a device by calling ibppc.
+
+    Args:
+        handle (int): device handle, or board handle to configure the
+            response of the board itself
+        line (int): data line the device answers on, 1 to 8 for DIO1 to
+            DIO8, default None meaning disable the response
+        sense (int): value of the device's individual status (ist) for which
+            it asserts the line, default 1
+
+    Returns:
+        int: ibsta value
+    """
+
+    status = _call(_lib.ibppc, handle, _parallel_poll_enable(line, sense))
+    if status.sta & ERR:
+        raise GpibError("parallel_poll_config", status)
+
+    return status.sta
+
+
+def parallel_poll_setup(board, lines, sense=1):
+    """Configure the parallel poll responses of many devices with a single
+    sequence of command bytes (UNL, listen address, PPC, PPE for each
+    device) on the board.
+
+    Args:
+        board (int): board handle
+        lines (dict): data line, 1 to 8 for DIO1 to DIO8, or None to
+            disable the response, for each device address, as taken by
+            parallel_poll_addresses()
+        sense (int): value of the individual status (ist) for which the
+            devices assert their line, default 1
+
+    Returns:
+        int: ibsta value
+    """
+
+    cmd = b''.join(
+        commands.address(None, [addr],
+                         (PPC, _parallel_poll_enable(line, sense) or PPD))
+        for addr, line in lines.items()) + commands.pack(UNL)
+
+    status = _call(_lib.ibcmd, board, cmd, len(cmd))
+    if status.sta & ERR:
+        raise GpibError("parallel_poll_setup", status)
+
+    return status.sta
+
+
+def parallel_poll_unconfig(board, addresses=None):
+    """Disable the parallel poll responses of devices with a single sequence
+    of command bytes on the board: PPU for all devices, or UNL, listen
+    addresses, PPC, PPD for some.
+
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple, default None meaning all devices
+
+    Returns:
+        int: ibsta value
+    """
+
+    if addresses is None:
+        cmd = commands.pack(PPU)
+    else:
+        cmd = commands.address(None, addresses, (PPC, PPD))
+
+    status = _call(_lib.ibcmd, board, cmd, len(cmd))
+    if status.sta & ERR:
+        raise GpibError("parallel_poll_unconfig", status)
+
+    return status.sta
+
+
+def _parallel_poll_enable(line, sense):
+    """Get the PPE byte for a data line 1 to 8 and sense, or 0 for None."""
+
+    if line is None:
+        return 0
+    if not 1 <= line <= 8:
+        raise ValueError("parallel poll line must be 1 to 8, not {!r}".format(
+            line))
+    return PPE | (0x8 if sense else 0) | (line - 1)
+
+
+def query(handle, cmd, max_len=None):
+    """Write a command and read the reply until END by calling ibwrt and
+    ibrd. The reply is read into a buffer of the calling thread which is
+    reused by later queries.
+
+    Args:
+        handle (int): board or device handle
+        cmd (bytes): sequence of bytes to write
+        max_len (int): maximum number of bytes to read, default None
+            meaning read until END
+
+    Returns:
+        bytes: reply
+    """
+
+    return _query(_lib, handle, cmd, max_len, "query")
+
+
+def query_many(handle, cmds, max_len=None, hold_gil=False):
+    """Run queries back to back, as by query().
+
+    With hold_gil, the library is called without releasing the GIL, so no
+    other Python thread runs between the calls of the queries. This also
+    blocks all other Python threads while the library waits for the bus,
+    so only use it with short timeouts. It is ignored unless the library
+    is a shared library using the cdecl calling convention.
+
+    Args:
+        handle (int): board or device handle
+        cmds (iterable): sequences of bytes to write
+        max_len (int): maximum number of bytes to read per reply, default
+            None meaning read until END
+        hold_gil (bool): do not release the GIL during library calls,
+            default False
+
+    Returns:
+        list: replies in the order of cmds
+    """
+
+    lib = _gil_holding_lib() if hold_gil else None
+    if lib is None:
+        lib = _lib
+    return [_query(lib, handle, cmd, max_len, "query_many") for cmd in cmds]
+
+
+# initial size of the reply buffer of each thread used by query(); larger
+# buffers are not kept after the query which needed them
+_query_buffer_size = 4096
+_query_buffer_max = 1 << 20
+
+
+def _query(lib, handle, cmd, max_len, funcname):
+    status = _call_on(lib, True, lib.ibwrt, handle, cmd, len(cmd))[1]
+    if status.sta & ERR:
+        raise GpibError(funcname, status)
+
+    buf = getattr(_local, "query_buffer", None)
+    if buf is None:
+        buf = _local.query_buffer = ctypes.create_string_buffer(
+            _query_buffer_size)
+    size = len(buf)
+    count = 0
+
+    try:
+        while True:
+            nbytes = size - count
+            if max_len is not None:
+                nbytes = min(nbytes, max_len - count)
+            target = buf if count == 0 else \
+                (ctypes.c_char * nbytes).from_buffer(buf, count)
+            status = _call_on(lib, True, lib.ibrd, handle, target, nbytes)[1]
+            if status.sta & ERR:
+                raise GpibError(funcname, status)
+            count += status.cnt
+
+            if status.sta & END or status.cnt == 0 or count == max_len:
+                break
+            if count == size:
+                size *= 2
+                grown = ctypes.create_string_buffer(size)
+                ctypes.memmove(grown, buf, count)
+                buf = _local.query_buffer = grown
+    finally:
+        # do not keep a buffer grown for one large reply, even when the
+        # read failed
+        if size > _query_buffer_max:
+            _local.query_buffer = None
+    return buf[:count]
+
+
+# (library, view of it calling without releasing the GIL) for query_many()
+_gil_holding = (None, None)
+
+
+def _gil_holding_lib():
+    """Get a view of the loaded library whose functions do not release the
+    GIL, or None if the library is not a cdecl shared library.
+    """
+
+    global _gil_holding
+
+    lib = _lib
+    if isinstance(lib, _LazyLibrary):
+        lib = lib._load()
+    if _gil_holding[0] is lib:
+        return _gil_holding[1]
+
+    held = None
+    if type(lib) is ctypes.CDLL:
+        held = ctypes.PyDLL(lib._name, handle=lib._handle)
+        if _status_lock is None:
+            held.ThreadIberr.restype = ctypes.c_int
+            held.ThreadIbcntl.restype = ctypes.c_long
+            setattr(held, "getiberr", held.ThreadIberr)
+            setattr(held, "getibcntl", held.ThreadIbcntl)
+        else:
+            # reading the global variables does not release the GIL
+            setattr(held, "getiberr", lib.getiberr)
+            setattr(held, "getibcntl", lib.getibcntl)
+    _gil_holding = (lib, held)
+    return held
+
+
 def read(handle, length):
     """Read a number of data bytes by calling ibread.
 
@@ -432,13 +1349,182 @@ def read(handle, length):
         bytes: sequence of bytes which was read
     """
 
-    retval = ctypes.create_string_buffer(length)
+    pool = _read_pool
+    if pool is None:
+        retval = ctypes.create_string_buffer(length)
+    else:
+        retval = pool.acquire(length)
+
+    try:
+        status = _call(_lib.ibrd, handle, retval, length)
+        if status.sta & ERR:
+            raise GpibError("read", status)
+
+        return retval[:status.cnt]
+    finally:
+        if pool is not None:
+            pool.release(retval)
+
+
+def read_into(handle, buf, offset=0, nbytes=None):
+    """Read data bytes directly into a caller-supplied buffer by calling ibrd.
+    No intermediate buffer is allocated and no data is copied.
+
+    Args:
+        handle (int): board or device handle
+        buf (bytearray, memoryview, array.array, mmap, ...): writable
+            object supporting the buffer protocol
+        offset (int): byte position in buf to start writing at, default 0
+        nbytes (int): maximum number of bytes to read, default None
+            meaning up to the end of buf
+
+    Returns:
+        int: number of bytes read
+    """
+
+    return _read_into(handle, buf, offset, nbytes, "read_into")[1]
+
 
-    sta = _lib.ibrd(handle, retval, length)
-    if sta & ERR:
-        raise GpibError("read")
+def _read_into(handle, buf, offset, nbytes, funcname):
+    """Call ibrd on a region of a writable buffer.
+
+    Returns:
+        tuple: ibsta value and number of bytes read
+    """
 
-    return retval[:ibcnt()]
+    target = _buffer_view(buf, offset, nbytes)
+
+    status = _call(_lib.ibrd, handle, target, len(target))
+    if status.sta & ERR:
+        raise GpibError(funcname, status)
+
+    return status.sta, status.cnt
+
+
+def set_read_pool(pool):
+    """Make read() take its buffers from a pool instead of allocating a new
+    buffer on every call.
+
+    Args:
+        pool (gpib.BufferPool): buffer pool, or None to disable pooling
+
+    Returns:
+        gpib.BufferPool: previously used pool or None
+    """
+
+    global _read_pool
+    previous, _read_pool = _read_pool, pool
+    return previous
+
+
+def read_block(handle, into=None, chunk_size=None):
+    """Read an IEEE 488.2 arbitrary block, either in the definite length
+    form #<n><length><data> or in the indefinite length form #0<data>
+    terminated by END. Any bytes preceding the # character, such as a
+    command header echoed by the instrument, are skipped.
+
+    The data is read directly into its destination without intermediate
+    copies. A definite length block is read into a buffer sized exactly
+    from its header.
+
+    Args:
+        handle (int): board or device handle
+        into (bytearray, memoryview, array.array, mmap, ...): writable
+            buffer to receive the data, default None meaning allocate
+            a new bytearray
+        chunk_size (int): maximum number of bytes per ibrd call, default
+            None meaning as many as the remaining data
+
+    Returns:
+        bytearray: block data, if into is None
+        int: number of data bytes written to into, otherwise
+    """
+
+    scratch = bytearray(16)
+
+    def read_header(nbytes):
+        sta, count = _read_into(handle, scratch, 0, nbytes, "read_block")
+        if count < nbytes or sta & END:
+            raise ValueError("read_block() error: truncated block header")
+        return bytes(scratch[:nbytes])
+
+    while read_header(1) != b'#':
+        pass
+
+    digits = read_header(1)
+    if not digits.isdigit():
+        raise ValueError(
+            "read_block() error: invalid block header {!r}".format(digits))
+
+    if digits == b'0':
+        return _read_indefinite_block(handle, into, chunk_size)
+
+    length = int(read_header(int(digits)))
+    if into is None:
+        dest = bytearray(length)
+    elif memoryview(into).nbytes < length:
+        raise ValueError(
+            "read_block() error: block of {:d} bytes does not fit in a "
+            "buffer of {:d} bytes".format(length, memoryview(into).nbytes))
+    else:
+        dest = into
+
+    offset = 0
+    sta = 0
+    while offset < length:
+        nbytes = length - offset
+        if chunk_size:
+            nbytes = min(nbytes, chunk_size)
+        sta, count = _read_into(handle, dest, offset, nbytes, "read_block")
+        offset += count
+        if sta & END and offset < length:
+            raise ValueError(
+                "read_block() error: block ended after {:d} of {:d} "
+                "bytes".format(offset, length))
+
+    # discard the message terminator following the block
+    while not sta & END:
+        sta, count = _read_into(handle, scratch, 0, None, "read_block")
+
+    return dest if into is None else length
+
+
+def _read_indefinite_block(handle, into, chunk_size):
+    """Read the data of an indefinite length block #0<data> until END,
+    dropping the final newline terminator.
+    """
+
+    if into is None:
+        chunk_size = chunk_size or 65536
+        dest = bytearray()
+        sta = 0
+        while not sta & END:
+            offset = len(dest)
+            dest.extend(bytearray(chunk_size))
+            sta, count = _read_into(
+                handle, dest, offset, chunk_size, "read_block")
+            del dest[offset + count:]
+        if dest.endswith(b'\n'):
+            del dest[-1:]
+        return dest
+
+    size = memoryview(into).nbytes
+    offset = 0
+    sta = 0
+    while not sta & END:
+        if offset == size:
+            raise ValueError(
+                "read_block() error: block does not fit in a buffer of "
+                "{:d} bytes".format(size))
+        nbytes = size - offset
+        if chunk_size:
+            nbytes = min(nbytes, chunk_size)
+        sta, count = _read_into(handle, into, offset, nbytes, "read_block")
+        offset += count
+
+    if offset and _buffer_view(into, offset - 1, 1).raw == b'\n':
+        offset -= 1
+    return offset
 
 
 def remote_enable(handle, enable):
@@ -452,11 +1538,32 @@ def remote_enable(handle, enable):
         int: ibsta value
     """
 
-    sta = _lib.ibsre(handle, enable)
-    if sta & ERR:
-        raise GpibError("remote_enable")
+    status = _call(_lib.ibsre, handle, enable)
+    if status.sta & ERR:
+        raise GpibError("remote_enable", status)
+
+    return status.sta
+
+
+def remote_list(board, addresses):
+    """Put many devices in remote mode at once. Uses EnableRemote where the
+    library provides it, otherwise asserts remote enable with ibsre and
+    addresses the devices as listeners with a single sequence of command
+    bytes (UNL, listen addresses) on the board.
 
-    return sta
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple
+
+    Returns:
+        int: ibsta value
+    """
+
+    if not _has_extension("EnableRemote"):
+        remote_enable(board, 1)
+    return _list_command(board, addresses, "EnableRemote", None,
+                         "remote_list")
 
 
 def serial_poll(handle):
@@ -469,13 +1576,127 @@ def serial_poll(handle):
         int: serial poll status byte
     """
 
-    status = ctypes.c_char()
+    spb = ctypes.c_char()
+
+    status = _call(_lib.ibrsp, handle, ctypes.byref(spb))
+    if status.sta & ERR:
+        raise GpibError("serial_poll", status)
+
+    return int(spb.value[0])
+
+
+def serial_poll_many(board, addresses):
+    """Serial poll many devices in one call. Uses AllSpoll where the library
+    provides it, otherwise a single serial poll sequence of command bytes
+    (UNL, board listen address, SPE, talk address and one status byte per
+    device, SPD, UNT) on the board.
+
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple
+
+    Returns:
+        dict: serial poll status byte for each address
+    """
+
+    addresses = list(addresses)
+    if not addresses:
+        return {}
+
+    if _has_extension("AllSpoll"):
+        addrlist = _address_list(addresses)
+        results = (ctypes.c_short * len(addresses))()
+        status = _call_ret(_lib.AllSpoll, board, addrlist, results)[1]
+        if status.sta & ERR:
+            raise GpibError("serial_poll_many", status)
+        return dict((addr, results[i] & 0xff)
+                    for i, addr in enumerate(addresses))
+
+    status = bytearray(1)
+    results = {}
+    command(board, commands.address(None, [_board_address(board)], (SPE,)))
+    try:
+        for addr in addresses:
+            command(board, commands.talk(addr))
+            _read_into(board, status, 0, 1, "serial_poll_many")
+            results[addr] = status[0]
+    finally:
+        command(board, commands.pack(SPD, UNT))
+
+    return results
+
+
+def _board_address(board):
+    """Get the (pad, sad) address of a board by calling ibask. The address
+    is cached until the board handle is closed or its address changed
+    with config().
+    """
+
+    try:
+        return _board_addresses[board]
+    except KeyError:
+        address = _board_addresses[board] = \
+            ask(board, IbaPAD), ask(board, IbaSAD)
+        return address
+
+
+def _address_list(addresses):
+    """Build a NOADDR-terminated NI-488.2 Addr4882_t array."""
+
+    addrlist = (ctypes.c_ushort * (len(addresses) + 1))()
+    for i, addr in enumerate(addresses):
+        pad, sad = _split_address(addr)
+        addrlist[i] = pad | (sad << 8)
+    addrlist[len(addresses)] = NOADDR
+    return addrlist
+
+
+def _list_command(board, addresses, extension, cmd, funcname):
+    """Send a command to a list of devices by calling extension with a
+    NOADDR-terminated address list, or with one ibcmd addressing all the
+    devices as listeners and sending cmd if it is not None.
+    """
+
+    addresses = list(addresses)
+    if not addresses:
+        # the NI-488.2 routines treat an empty list as all devices
+        raise ValueError("{:s}() needs at least one address".format(funcname))
+
+    if _has_extension(extension):
+        status = _call_ret(getattr(_lib, extension), board,
+                           _address_list(addresses))[1]
+    else:
+        cmd = commands.address(None, addresses, () if cmd is None else (cmd,))
+        status = _call(_lib.ibcmd, board, cmd, len(cmd))
+    if status.sta & ERR:
+        raise GpibError(funcname, status)
+
+    return status.sta
+
+
+def set_addressing(handle, readdress=True, unaddress=True):
+    """Configure the addressing done by device-level IO, by calling
+    ibconfig with IbcREADDR and IbcUnAddr.
+
+    Without readdress, ibrd and ibwrt on the handle skip addressing when
+    the device is still addressed by the previous call. Without unaddress,
+    they do not send UNT and UNL after the transfer, so the addressing
+    remains for the next call.
+
+    Args:
+        handle (int): device handle
+        readdress (bool): address the bus before every transfer, default
+            True
+        unaddress (bool): unaddress the bus after every transfer, default
+            True
 
-    sta = _lib.ibrsp(handle, ctypes.byref(status))
-    if sta & ERR:
-        raise GpibError("serial_poll")
+    Returns:
+        int: ibsta value
+    """
 
-    return int(status.value[0])
+    config(handle, IbcREADDR, int(bool(readdress)))
+    return config(handle, IbcUnAddr, int(bool(unaddress)))
 
 
 def spoll_bytes(handle):
@@ -490,13 +1711,80 @@ def spoll_bytes(handle):
 
     length = ctypes.c_short()
 
-    sta = _lib.ibspb(handle, ctypes.byref(length))
-    if sta & ERR:
-        raise GpibError("spoll_bytes")
+    status = _call(_lib.ibspb, handle, ctypes.byref(length))
+    if status.sta & ERR:
+        raise GpibError("spoll_bytes", status)
 
     return length.value
 
 
+def start_read(handle, length):
+    """Start reading a number of data bytes asynchronously by calling ibrda.
+
+    Args:
+        handle (int): board or device handle
+        length (int): number of bytes to read
+
+    Returns:
+        AsyncTransfer: transfer in progress, its result() is the sequence
+            of bytes which was read
+    """
+
+    buf = ctypes.create_string_buffer(length)
+
+    status = _call(_lib.ibrda, handle, buf, length)
+    if status.sta & ERR:
+        raise GpibError("start_read", status)
+
+    transfer = AsyncTransfer(handle, buf, "start_read")
+    transfer.sta = status.sta
+    _transfers[handle] = transfer
+    return transfer
+
+
+def start_write(handle, data):
+    """Start writing data bytes asynchronously by calling ibwrta.
+
+    Args:
+        handle (int): board or device handle
+        data (bytes): sequence of bytes to write
+
+    Returns:
+        AsyncTransfer: transfer in progress, its result() is the number
+            of bytes written
+    """
+
+    return _start_write(handle, data, "start_write")
+
+
+def _start_write(handle, data, funcname):
+    status = _call(_lib.ibwrta, handle, data, len(data))
+    if status.sta & ERR:
+        raise GpibError(funcname, status)
+
+    transfer = AsyncTransfer(handle, data, funcname)
+    transfer.sta = status.sta
+    _transfers[handle] = transfer
+    return transfer
+
+
+def stop(handle):
+    """Abort asynchronous IO in progress by calling ibstop.
+
+    Args:
+        handle (int): board or device handle
+
+    Returns:
+        int: ibsta value
+    """
+
+    status = _call(_lib.ibstop, handle)
+    if status.sta & ERR:
+        raise GpibError("stop", status)
+
+    return status.sta
+
+
 def timeout(handle, t):
     """Set IO timeout by calling ibtmo.
 
@@ -508,11 +1796,11 @@ def timeout(handle, t):
         int: ibsta value
     """
 
-    sta = _lib.ibtmo(handle, t)
-    if sta & ERR:
-        raise GpibError("timeout")
+    status = _call(_lib.ibtmo, handle, t)
+    if status.sta & ERR:
+        raise GpibError("timeout", status)
 
-    return sta
+    return status.sta
 
 
 def trigger(handle):
@@ -525,11 +1813,28 @@ def trigger(handle):
         int: ibsta value
     """
 
-    sta = _lib.ibtrg(handle)
-    if sta & ERR:
-        raise GpibError("trigger")
+    status = _call(_lib.ibtrg, handle)
+    if status.sta & ERR:
+        raise GpibError("trigger", status)
 
-    return sta
+    return status.sta
+
+
+def trigger_list(board, addresses):
+    """Trigger many devices in the same bus cycle. Uses TriggerList where
+    the library provides it, otherwise a single sequence of command bytes
+    (UNL, listen addresses, GET) on the board.
+
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple
+
+    Returns:
+        int: ibsta value
+    """
+
+    return _list_command(board, addresses, "TriggerList", GET, "trigger_list")
 
 
 def version():
@@ -561,11 +1866,11 @@ def wait(handle, eventmask):
         int: ibsta value
     """
 
-    sta = _lib.ibwait(handle, eventmask)
-    if sta & ERR:
-        raise GpibError("wait")
+    status = _call(_lib.ibwait, handle, eventmask)
+    if status.sta & ERR:
+        raise GpibError("wait", status)
 
-    return sta
+    return status.sta
 
 
 def write(handle, data):
@@ -579,15 +1884,16 @@ def write(handle, data):
         int: ibsta value
     """
 
-    sta = _lib.ibwrt(handle, data, len(data))
-    if sta & ERR:
-        raise GpibError("write")
+    status = _call(_lib.ibwrt, handle, data, len(data))
+    if status.sta & ERR:
+        raise GpibError("write", status)
 
-    return sta
+    return status.sta
 
 
 def write_async(handle, data):
-    """Write data bytes asynchronously by calling ibwrta.
+    """Write data bytes asynchronously by calling ibwrta. The data is kept
+    alive until the transfer completes, see start_write() to track it.
 
     Args:
         handle (int): board or device handle
@@ -597,8 +1903,38 @@ def write_async(handle, data):
         int: ibsta value
     """
 
-    sta = _lib.ibwrta(handle, data, len(data))
-    if sta & ERR:
-        raise GpibError("write_async")
+    return _start_write(handle, data, "write_async").sta
+
+
+def write_broadcast(board, addresses, data):
+    """Write the same data bytes to many devices at once. Uses SendList
+    where the library provides it, otherwise addresses the devices as
+    listeners and the board as talker with a single sequence of command
+    bytes and writes the data once by calling ibwrt on the board, which
+    sends EOI with the last byte as configured by IbcEOT of the board.
+
+    Args:
+        board (int): board handle
+        addresses (iterable): device addresses, each either a primary
+            address or a (pad, sad) tuple
+        data (bytes): sequence of bytes to write
+
+    Returns:
+        int: ibsta value
+    """
+
+    addresses = list(addresses)
+    if not addresses:
+        # SendList treats an empty list as the current listeners
+        raise ValueError("write_broadcast() needs at least one address")
+
+    if _has_extension("SendList"):
+        status = _call_ret(_lib.SendList, board, _address_list(addresses),
+                           data, len(data), DABend)[1]
+    else:
+        command(board, commands.address(_board_address(board), addresses))
+        status = _call(_lib.ibwrt, board, data, len(data))
+    if status.sta & ERR:
+        raise GpibError("write_broadcast", status)
 
-    return sta
+    return status.sta
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+"""Reference counted pool of board and device handles."""
+
+import threading
+import time
+
+from .constants import *
+from .gpib import close, dev, find
+
+
+class PooledHandle(object):
+    """Reference to a handle borrowed from a HandlePool. Returns the handle
+    to the pool on release() or at the end of a with block.
+    """
+
+    def __init__(self, pool, key, handle):
+        self.pool = pool
+        self.key = key
+        self.handle = handle
+
+    def __repr__(self):
+        return "%s(%r, %d)" % (self.__class__.__name__, self.key, self.handle)
+
+    def __enter__(self):
+        return self.handle
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def release(self):
+        """Return the handle to the pool. Further calls have no effect."""
+
+        if self.pool is not None:
+            self.pool._release(self.key)
+            self.pool = None
+
+
+class _Entry(object):
+    __slots__ = ('handle', 'refs', 'last_used')
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.refs = 0
+        self.last_used = 0.0
+
+
+class HandlePool(object):
+    """Pool of handles obtained with ibdev and ibfind, keyed by their
+    arguments. Borrowers of the same key share one handle; a handle no
+    longer borrowed by anyone stays open for reuse until it is evicted.
+
+    Handles are shared as is, so configuration changed through one
+    borrower, eg. with gpib.timeout(), is seen by the others.
+
+    Example usage:
+
+    pool = HandlePool()
+    with pool.dev(0, 23) as handle:
+        gpib.write(handle, b'*IDN?')
+    """
+
+    def __init__(self, max_idle=16, idle_timeout=60.0):
+        """Create an empty pool.
+
+        Args:
+            max_idle (int): maximum number of idle handles kept open,
+                default 16
+            idle_timeout (float): idle handles older than this many seconds
+                are closed, default 60.0; None keeps them indefinitely
+        """
+
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> _Entry
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def dev(self, board, pad, sad=NO_SAD, tmo=T30s, sendeoi=1, eos=0):
+        """Borrow a device handle, calling ibdev if none is pooled.
+        Arguments are as for gpib.dev().
+
+        Returns:
+            PooledHandle: borrowed handle
+        """
+
+        key = (board, pad, sad, tmo, sendeoi, eos)
+        return self._acquire(key, dev, key)
+
+    def find(self, name):
+        """Borrow a handle by name, calling ibfind if none is pooled.
+        Arguments are as for gpib.find().
+
+        Returns:
+            PooledHandle: borrowed handle
+        """
+
+        return self._acquire(name, find, (name,))
+
+    def _acquire(self, key, opener, args):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self.hits += 1
+                return PooledHandle(self, key, entry.handle)
+            self.misses += 1
+
+        # open outside the lock, ibdev may take a while
+        handle = opener(*args)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(handle)
+                handle = None
+            entry.refs += 1
+            pooled = PooledHandle(self, key, entry.handle)
+
+        if handle is not None:
+            # another thread opened the same key meanwhile
+            close(handle)
+        return pooled
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # closed by close_all()
+                return
+            entry.refs -= 1
+            entry.last_used = time.time()
+        self.evict_idle()
+
+    def evict_idle(self):
+        """Close idle handles older than idle_timeout and the oldest idle
+        handles in excess of max_idle.
+
+        Returns:
+            int: number of handles closed
+        """
+
+        now = time.time()
+        with self._lock:
+            idle = sorted(((e.last_used, key) for key, e in
+                           self._entries.items() if e.refs == 0),
+                          key=lambda item: item[0])
+            excess = len(idle) - self.max_idle
+            evicted = []
+            for i, (last_used, key) in enumerate(idle):
+                if i < excess or (self.idle_timeout is not None and
+                                  now - last_used > self.idle_timeout):
+                    evicted.append(self._entries.pop(key).handle)
+            self.evictions += len(evicted)
+
+        for handle in evicted:
+            close(handle)
+        return len(evicted)
+
+    def close_all(self):
+        """Close all pooled handles, including borrowed ones."""
+
+        with self._lock:
+            handles = [e.handle for e in self._entries.values()]
+            self._entries.clear()
+
+        for handle in handles:
+            close(handle)
+
+    def stats(self):
+        """Get pool usage counters.
+
+        Returns:
+            dict: hits, misses, evictions, open and borrowed handle counts
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'open': len(self._entries),
+                'borrowed': sum(1 for e in self._entries.values() if e.refs),
+            }
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""Call counts, transferred bytes, errors and latency of library calls.
+
+Instrumentation is off by default and then costs one global variable
+check per library call. Example usage:
+
+from gpib_ctypes.gpib import metrics
+
+m = metrics.enable()
+m.name_handle(dmm_handle, 'dmm')
+...
+print(m.to_prometheus())
+metrics.disable()
+"""
+
+import bisect
+import threading
+
+from . import gpib as _gpib
+
+# latency histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2,
+                   0.1, 0.3, 1.0, 3.0, 10.0, 30.0)
+
+# library functions whose ibcntl is a number of transferred bytes
+_TRANSFER_FUNCTIONS = frozenset(
+    ('ibrd', 'ibrda', 'ibwrt', 'ibwrta', 'ibcmd', 'ibcmda'))
+
+
+class _Series(object):
+    __slots__ = ('calls', 'bytes', 'errors', 'buckets', 'seconds')
+
+    def __init__(self, nbuckets):
+        self.calls = 0
+        self.bytes = 0
+        self.errors = {}   # iberr code -> count
+        self.buckets = [0] * (nbuckets + 1)
+        self.seconds = 0.0
+
+
+class Metrics(object):
+    """Collects per-function and per-handle statistics of library calls.
+    An instance is installed as the call observer by enable().
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Create an empty collector.
+
+        Args:
+            buckets (tuple): increasing latency histogram bucket upper
+                bounds in seconds, default DEFAULT_BUCKETS
+        """
+
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # (function, handle) -> _Series
+        self._names = {}   # handle -> label
+
+    def __call__(self, func, args, status, seconds):
+        function = getattr(func, '__name__', None) or repr(func)
+        handle = args[0] if args else None
+
+        with self._lock:
+            series = self._series.get((function, handle))
+            if series is None:
+                series = self._series[(function, handle)] = _Series(
+                    len(self.buckets))
+            series.calls += 1
+            series.seconds += seconds
+            series.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+            if status.sta & _gpib.ERR:
+                series.errors[status.err] = \
+                    series.errors.get(status.err, 0) + 1
+            elif function in _TRANSFER_FUNCTIONS:
+                series.bytes += status.cnt
+
+    def name_handle(self, handle, name):
+        """Label a handle, eg. with the instrument name, in snapshots and
+        exported metrics.
+
+        Args:
+            handle (int): board or device handle
+            name (str): label
+        """
+
+        with self._lock:
+            self._names[handle] = name
+
+    def reset(self):
+        """Discard all collected statistics. Handle labels are kept."""
+
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        """Get a copy of the collected statistics.
+
+        Returns:
+            list: one dict per function and handle with keys function,
+                handle, calls, bytes, errors (dict of iberr code to count),
+                seconds (total latency) and buckets (list of (upper bound,
+                count) pairs, not cumulative, the last bound being inf)
+        """
+
+        bounds = self.buckets + (float('inf'),)
+        with self._lock:
+            return [{
+                'function': function,
+                'handle': self._names.get(handle, handle),
+                'calls': series.calls,
+                'bytes': series.bytes,
+                'errors': dict(series.errors),
+                'seconds': series.seconds,
+                'buckets': list(zip(bounds, series.buckets)),
+            } for (function, handle), series in sorted(
+                self._series.items(), key=lambda item: repr(item[0]))]
+
+    def to_prometheus(self, prefix='gpib'):
+        """Export the collected statistics in the Prometheus text
+        exposition format.
+
+        Args:
+            prefix (str): metric name prefix, default 'gpib'
+
+        Returns:
+            str: exposition text
+        """
+
+        calls, transferred, errors, latency = [], [], [], []
+        for entry in self.snapshot():
+            labels = 'function="{:s}",handle="{:s}"'.format(
+                _escape(entry['function']), _escape(str(entry['handle'])))
+            calls.append('{:s}_calls_total{{{:s}}} {:d}'.format(
+                prefix, labels, entry['calls']))
+            if entry['function'] in _TRANSFER_FUNCTIONS:
+                transferred.append('{:s}_bytes_total{{{:s}}} {:d}'.format(
+                    prefix, labels, entry['bytes']))
+            for code, count in sorted(entry['errors'].items()):
+                errors.append(
+                    '{:s}_errors_total{{{:s},iberr="{:d}"}} {:d}'.format(
+                        prefix, labels, code, count))
+            cumulative = 0
+            for bound, count in entry['buckets']:
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                latency.append(
+                    '{:s}_call_duration_seconds_bucket{{{:s},le="{:s}"}} '
+                    '{:d}'.format(prefix, labels, le, cumulative))
+            latency.append(
+                '{:s}_call_duration_seconds_sum{{{:s}}} {!r}'.format(
+                    prefix, labels, entry['seconds']))
+            latency.append(
+                '{:s}_call_duration_seconds_count{{{:s}}} {:d}'.format(
+                    prefix, labels, entry['calls']))
+
+        lines = []
+        for name, kind, text, samples in (
+                ('calls_total', 'counter', 'GPIB library calls.', calls),
+                ('bytes_total', 'counter',
+                 'Bytes transferred by GPIB library calls.', transferred),
+                ('errors_total', 'counter',
+                 'Failed GPIB library calls by iberr code.', errors),
+                ('call_duration_seconds', 'histogram',
+                 'GPIB library call latency.', latency)):
+            lines.append('# HELP {:s}_{:s} {:s}'.format(prefix, name, text))
+            lines.append('# TYPE {:s}_{:s} {:s}'.format(prefix, name, kind))
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def enable(metrics=None):
+    """Start collecting statistics of all library calls made through
+    gpib_ctypes.gpib.
+
+    Args:
+        metrics (Metrics): collector to use, default None meaning a new one
+
+    Returns:
+        Metrics: installed collector
+    """
+
+    if metrics is None:
+        metrics = Metrics()
+    _gpib._observer = metrics
+    return metrics
+
+
+def disable():
+    """Stop collecting statistics.
+
+    Returns:
+        Metrics: previously installed collector or None
+    """
+
+    metrics, _gpib._observer = _gpib._observer, None
+    return metrics
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""Per-board scheduling of GPIB operations by priority."""
+
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+
+from .constants import *
+from .gpib import ask, config, write, _read_into
+
+# operation priorities
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+
+
+class BoardScheduler(object):
+    """Runs the GPIB operations of one board on a worker thread.
+
+    Queued operations are ordered by a virtual deadline: the time they were
+    queued plus a delay depending on their priority. Interactive operations
+    therefore overtake queued bulk operations on other handles, but an
+    operation is never overtaken by one queued more than the difference of
+    their delays later, so bulk transfers cannot starve. Operations on the
+    same handle always run in the order they were queued, whatever their
+    priority.
+
+    Reads and writes are split into chunks which are queued one at a time,
+    so that short operations on other devices of the board can run between
+    the chunks of a long transfer.
+
+    Example usage:
+
+    scheduler = BoardScheduler(0)
+    waveform = scheduler.read(scope_handle, 100000000)
+    stb = scheduler.submit(INTERACTIVE, gpib.serial_poll, dmm_handle)
+    print(stb.result(), len(waveform.result()))
+    scheduler.shutdown()
+    """
+
+    def __init__(self, board, delays=(0.0, 0.01, 0.1), chunk_size=65536):
+        """Create a scheduler and start its worker thread.
+
+        Args:
+            board (int): board index, used to name the worker thread
+            delays (tuple): seconds added to the virtual deadline of
+                INTERACTIVE, NORMAL and BULK operations, default
+                (0.0, 0.01, 0.1)
+            chunk_size (int): maximum number of bytes transferred by one
+                chunk of read() or write(), default 65536
+        """
+
+        self.board = board
+        self.delays = delays
+        self.chunk_size = chunk_size
+        self._cond = threading.Condition()
+        # heap of [deadline, seq, priority, queued, op, handle, future],
+        # holding at most one operation of each handle
+        self._queue = []
+        self._seq = itertools.count()
+        # handle -> deque of operations waiting for the handle's operation
+        # which is in the heap or running
+        self._waiting = {}
+        self._stopping = False
+        self._stats = {}
+        self.reset_stats()
+        self._thread = threading.Thread(
+            target=self._run, name="gpib{:d}-scheduler".format(board))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, priority, func, *args):
+        """Queue a call of func(*args).
+
+        Args:
+            priority (int): INTERACTIVE, NORMAL or BULK
+            func (callable): function to call, typically one of
+                gpib_ctypes.gpib functions
+            *args: arguments to func
+
+        Returns:
+            concurrent.futures.Future: resolves to the return value of func
+        """
+
+        return self._submit(priority, args[0] if args else None, func, *args)
+
+    def _submit(self, priority, handle, func, *args):
+        future = concurrent.futures.Future()
+
+        def op():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            return True
+
+        self._put(priority, op, handle, future)
+        return future
+
+    def query(self, handle, data, length=512, priority=INTERACTIVE):
+        """Queue a write followed by a read as one operation.
+
+        Args:
+            handle (int): board or device handle
+            data (bytes): sequence of bytes to write
+            length (int): maximum number of bytes to read, default 512
+            priority (int): default INTERACTIVE
+
+        Returns:
+            concurrent.futures.Future: resolves to the bytes read
+        """
+
+        def query():
+            write(handle, data)
+            return self._read_chunks(handle, bytearray(length), 0, length)
+
+        return self._submit(priority, handle, query)
+
+    def read(self, handle, length, priority=BULK):
+        """Queue a chunked read of up to length bytes, ending early on END.
+
+        Args:
+            handle (int): board or device handle
+            length (int): maximum number of bytes to read
+            priority (int): default BULK
+
+        Returns:
+            concurrent.futures.Future: resolves to the bytes read
+        """
+
+        future = concurrent.futures.Future()
+        buf = bytearray(length)
+        state = {'offset': 0, 'started': False}
+
+        def chunk():
+            if not state['started']:
+                state['started'] = True
+                if not future.set_running_or_notify_cancel():
+                    return True
+            try:
+                offset = state['offset']
+                nbytes = min(self.chunk_size, length - offset)
+                sta, count = _read_into(handle, buf, offset, nbytes, "read")
+                state['offset'] = offset = offset + count
+                if sta & END or offset >= length:
+                    del buf[offset:]
+                    future.set_result(bytes(buf))
+                    return True
+            except BaseException as e:
+                future.set_exception(e)
+                return True
+            return False
+
+        self._put(priority, chunk, handle, future)
+        return future
+
+    def write(self, handle, data, priority=BULK):
+        """Queue a chunked write. EOI is suppressed on all but the last
+        chunk by setting IbcEOT on the handle, and restored afterwards.
+
+        Args:
+            handle (int): board or device handle
+            data (bytes): sequence of bytes to write
+            priority (int): default BULK
+
+        Returns:
+            concurrent.futures.Future: resolves to the ibsta value of the
+                last chunk
+        """
+
+        future = concurrent.futures.Future()
+        view = memoryview(data)
+        state = {'offset': 0, 'eot': None}
+
+        def chunk():
+            offset = state['offset']
+            if offset == 0 and not future.set_running_or_notify_cancel():
+                return True
+            try:
+                last = len(view) - offset <= self.chunk_size
+                if not last and state['eot'] is None:
+                    state['eot'] = ask(handle, IbaEOT)
+                    config(handle, IbcEOT, 0)
+                elif last and state['eot'] is not None:
+                    config(handle, IbcEOT, state['eot'])
+                    state['eot'] = None
+                sta = write(handle,
+                            view[offset:offset + self.chunk_size].tobytes())
+                state['offset'] = offset + self.chunk_size
+                if last:
+                    future.set_result(sta)
+                    return True
+            except BaseException as e:
+                if state['eot'] is not None:
+                    config(handle, IbcEOT, state['eot'])
+                future.set_exception(e)
+                return True
+            return False
+
+        self._put(priority, chunk, handle, future)
+        return future
+
+    def stats(self):
+        """Get queue wait time statistics per priority.
+
+        Returns:
+            dict: for each priority, a dict with the number of operations
+                (or chunks) started, and the total and maximum time in
+                seconds they waited in the queue, plus the current queue
+                length under 'queued'
+        """
+
+        with self._cond:
+            stats = dict((priority, dict(values))
+                         for priority, values in self._stats.items())
+            stats['queued'] = len(self._queue) + sum(
+                len(waiting) for waiting in self._waiting.values())
+        return stats
+
+    def reset_stats(self):
+        """Reset the queue wait time statistics."""
+
+        with self._cond:
+            self._stats = dict(
+                (priority, {'ops': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+                for priority in (INTERACTIVE, NORMAL, BULK))
+
+    def shutdown(self, wait=True):
+        """Stop the worker after the queued operations have run.
+
+        Args:
+            wait (bool): block until the worker has exited, default True
+        """
+
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+    def _read_chunks(self, handle, buf, offset, length):
+        while offset < length:
+            nbytes = min(self.chunk_size, length - offset)
+            sta, count = _read_into(handle, buf, offset, nbytes, "read")
+            offset += count
+            if sta & END:
+                break
+        return bytes(buf[:offset])
+
+    def _put(self, priority, op, handle, future):
+        """Queue op, a callable returning True when the operation is
+        finished or False to be called again for its next chunk.
+        """
+
+        now = time.time()
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("BoardScheduler is shut down")
+            item = [now + self.delays[priority], next(self._seq), priority,
+                    now, op, handle, future]
+            if handle is None:
+                heapq.heappush(self._queue, item)
+            elif handle in self._waiting:
+                # wait behind the operation queued or running on the handle
+                self._waiting[handle].append(item)
+            else:
+                self._waiting[handle] = collections.deque()
+                heapq.heappush(self._queue, item)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                item = heapq.heappop(self._queue)
+
+                priority, queued, op, handle, future = item[2:]
+                stats = self._stats[priority]
+                wait = time.time() - queued
+                stats['ops'] += 1
+                stats['wait_total'] += wait
+                stats['wait_max'] = max(stats['wait_max'], wait)
+
+            try:
+                finished = op()
+            except BaseException as e:
+                # eg. restoring the handle configuration failed, do not let
+                # it stop the worker with other futures pending
+                if not future.done():
+                    future.set_exception(e)
+                finished = True
+
+            with self._cond:
+                if not finished:
+                    # queue the next chunk as a new operation
+                    now = time.time()
+                    item[0:2] = now + self.delays[priority], next(self._seq)
+                    item[3] = now
+                    heapq.heappush(self._queue, item)
+                elif handle is not None:
+                    waiting = self._waiting[handle]
+                    if waiting:
+                        heapq.heappush(self._queue, waiting.popleft())
+                    else:
+                        del self._waiting[handle]
+                    self._cond.notify()
@@ -0,0 +1,969 @@
+# -*- coding: utf-8 -*-
+
+"""Simulated GPIB library hosting scripted virtual instruments, for testing
+and benchmarking without GPIB hardware.
+
+Load it in place of the GPIB library with a JSON configuration file:
+
+gpib._load_lib('sim:bench.json')
+
+or with "sim:" alone for one empty board 0. Example configuration:
+
+{
+    "time_scale": 1.0,
+    "boards": [{"index": 0, "pad": 0, "rate": 1e6, "latency": 5e-5}],
+    "instruments": [
+        {"board": 0, "pad": 22, "name": "dmm",
+         "responses": {"*IDN?": "ACME,DMM,0,1.0", "READ?": "+1.234E+00",
+                       "CURV?": {"block": 100000}},
+         "response_delay": 0.002,
+         "srq": {"INIT": 1}, "srq_delay": 0.5},
+        {"board": 0, "pad": 5, "class": "mypackage.instruments:PowerSupply",
+         "voltage": 5.0}
+    ]
+}
+
+Timing model: every call takes the board latency plus the number of bytes
+transferred divided by the board rate in bytes per second. Replies become
+readable response_delay seconds after the query was received, and the
+status bytes listed under srq are requested srq_delay seconds after their
+command. All delays and timeouts are multiplied by time_scale; with a
+time_scale of 0 the simulation never waits and reads which would have to
+wait for a reply time out at once.
+
+The simulation tracks talker and listener addressing of each board, so
+command() followed by board-level read() and write(), serial polls in
+SPE/SPD mode, GET, SDC, GTL, DCL, LLO and parallel polls behave as on a
+real bus. In a parallel poll an instrument's individual status (ist) is
+whether it requests service. EOS handling and events are not simulated.
+
+Instruments are SimInstrument objects; subclass it and override handle()
+for behaviour beyond fixed replies, and select the subclass with the
+"class" key of an instrument configuration. Other keys are passed to its
+constructor.
+"""
+
+import collections
+import ctypes
+import functools
+import importlib
+import itertools
+import json
+import threading
+import time
+
+from .constants import *
+
+# seconds of the timeout constants TNONE to T1000s, None meaning no timeout
+_TIMEOUTS = (None, 10e-6, 30e-6, 100e-6, 300e-6, 1e-3, 3e-3, 10e-3, 30e-3,
+             0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0, 300.0, 1000.0)
+
+# first device handle, board handles are the board indices below it
+_FIRST_DEVICE = 16
+
+_PATTERN = bytes(bytearray(range(256)))
+
+
+def _data_block(size):
+    """IEEE 488.2 definite length arbitrary block of size bytes."""
+
+    digits = str(size).encode('ascii')
+    payload = (_PATTERN * (size // len(_PATTERN) + 1))[:size]
+    return b'#' + str(len(digits)).encode('ascii') + digits + payload
+
+
+class SimInstrument(object):
+    """Scripted virtual instrument replying to commands with fixed
+    responses.
+
+    Messages written to the instrument end with EOI or the terminator and
+    may hold several commands separated by separator. Each command is
+    looked up in responses; a reply is a string, or a dict
+    {"block": size} for an IEEE 488.2 arbitrary block of size bytes.
+    The replies to one message are joined with separator and queued for
+    reading, followed by the terminator. Group execute trigger is handled
+    like the command "*TRG".
+    """
+
+    def __init__(self, responses=None, default=None, terminator='\n',
+                 separator=';', status_byte=0, response_delay=0.0,
+                 srq=None, srq_delay=0.0):
+        """Create an instrument.
+
+        Args:
+            responses (dict): reply for each command, default None
+            default: reply to other commands, default None meaning no reply
+            terminator (str): message terminator, default '\\n'
+            separator (str): command separator, default ';'; None treats
+                each message as one command
+            status_byte (int): initial status byte, default 0
+            response_delay (float): seconds until a reply can be read,
+                default 0.0
+            srq (dict): status byte bits to request service with after
+                each command, default None
+            srq_delay (float): seconds from the command to the service
+                request, default 0.0
+        """
+
+        self.responses = dict(responses or {})
+        self.default = default
+        self.terminator = terminator.encode('latin-1')
+        self.separator = separator
+        self.status_byte = status_byte
+        self.response_delay = response_delay
+        self.srq = dict(srq or {})
+        self.srq_delay = srq_delay
+        self.remote = False
+        self.locked_out = False
+        self.ppoll_config = None  # PPE byte configuring the parallel poll
+        self.history = collections.deque(maxlen=256)  # received commands
+        self._input = bytearray()
+        self._output = collections.deque()  # [ready time, data, offset]
+        self._requests = []                 # (time, status byte bits)
+
+    def handle(self, command):
+        """Get the reply to one command. Override to simulate instruments
+        with state.
+
+        Args:
+            command (str): command without whitespace and separators
+
+        Returns:
+            str or bytes: reply, or None for no reply
+        """
+
+        reply = self.responses.get(command, self.default)
+        if isinstance(reply, dict) and 'block' in reply:
+            reply = _data_block(int(reply['block']))
+        return reply
+
+    def clear(self):
+        """Device clear: discard pending input and output."""
+
+        del self._input[:]
+        self._output.clear()
+        self._requests = []
+        self.status_byte &= ~IbStbRQS
+
+    def _receive(self, data, end, now, scale):
+        self._input += data
+        if not end and not self._input.endswith(self.terminator):
+            return
+        message = bytes(self._input).decode('latin-1')
+        del self._input[:]
+
+        if self.separator:
+            commands = message.split(self.separator)
+        else:
+            commands = [message]
+        replies = []
+        for command in commands:
+            command = command.strip()
+            if command:
+                reply = self._execute(command, now, scale)
+                if reply is not None:
+                    if not isinstance(reply, bytes):
+                        reply = reply.encode('latin-1')
+                    replies.append(reply)
+        if replies:
+            separator = (self.separator or '').encode('latin-1')
+            self._output.append([now + self.response_delay * scale,
+                                 separator.join(replies) + self.terminator,
+                                 0])
+
+    def _execute(self, command, now, scale):
+        self.history.append(command)
+        reply = self.handle(command)
+        if command in self.srq:
+            self._requests.append((now + self.srq_delay * scale,
+                                   self.srq[command]))
+        return reply
+
+    def _read(self, length, now):
+        """Take up to length bytes of the next ready reply.
+
+        Returns:
+            tuple: (data, end) or None if no reply is ready
+        """
+
+        if not self._output or self._output[0][0] > now:
+            return None
+        entry = self._output[0]
+        offset = entry[2]
+        data = entry[1][offset:offset + length]
+        entry[2] = offset + len(data)
+        if entry[2] < len(entry[1]):
+            return data, False
+        self._output.popleft()
+        return data, True
+
+    def _requesting(self, now):
+        if self._requests:
+            due = [r for r in self._requests if r[0] <= now]
+            if due:
+                self._requests = [r for r in self._requests if r[0] > now]
+                for t, bits in due:
+                    self.status_byte |= bits | IbStbRQS
+        return bool(self.status_byte & IbStbRQS)
+
+    def _parallel_poll(self, now):
+        """Get the response bit of a parallel poll, or 0."""
+
+        config = self.ppoll_config
+        if config is None or bool(config & 0x8) != self._requesting(now):
+            return 0
+        return 1 << (config & 0x7)
+
+    def _serial_poll(self, now):
+        self._requesting(now)
+        stb = self.status_byte
+        if self._output and self._output[0][0] <= now:
+            stb |= IbStbMAV
+        self.status_byte &= ~IbStbRQS
+        return stb
+
+    def _next_event(self, now):
+        times = [r[0] for r in self._requests]
+        if self._output:
+            times.append(self._output[0][0])
+        times = [t for t in times if t > now]
+        return min(times) if times else None
+
+
+class _Board(object):
+
+    def __init__(self, index, pad=0, rate=1e6, latency=50e-6):
+        self.index = index
+        self.pad = pad
+        self.rate = rate
+        self.latency = latency
+        self.instruments = {}  # (pad, sad) -> SimInstrument
+        self.names = {}        # name -> (pad, sad)
+        self.talker = None     # (pad, sad)
+        self.listeners = set()
+        self.last_addressed = None  # (listeners or talker, pad)
+        self.spoll = False
+        self.remote_enable = False
+
+
+class _Handle(object):
+    __slots__ = ('board', 'pad', 'sad', 'tmo', 'eot', 'eos', 'config',
+                 'transfer')
+
+    def __init__(self, board, pad, sad, tmo, eot, eos):
+        self.board = board
+        self.pad = pad
+        self.sad = sad
+        self.tmo = tmo
+        self.eot = eot
+        self.eos = eos
+        self.config = {}
+        self.transfer = None
+
+
+class _Transfer(object):
+    __slots__ = ('done', 'cancelled', 'sta', 'err', 'cnt')
+
+    def __init__(self):
+        self.done = False
+        self.cancelled = False
+        self.sta = 0
+        self.err = 0
+        self.cnt = 0
+
+
+class _Failure(Exception):
+
+    def __init__(self, err, sta=0, cnt=0):
+        Exception.__init__(self, err)
+        self.err = err
+        self.sta = sta
+        self.cnt = cnt
+
+
+def _entry(failed=None):
+    """Decorate a library entry point: GPIB errors raised as _Failure set
+    ERR and iberr, and return failed instead of ibsta if given.
+    """
+
+    def decorate(method):
+        @functools.wraps(method)
+        def entry(self, *args):
+            try:
+                return method(self, *args)
+            except _Failure as e:
+                sta = self._set(e.sta | ERR, e.err, e.cnt)
+                return sta if failed is None else failed
+        return entry
+    return decorate
+
+
+class SimulatedLibrary(object):
+    """Pure Python implementation of the GPIB library entry points used by
+    gpib_ctypes.gpib, backed by virtual boards and instruments.
+    """
+
+    def __init__(self, config=None, time_scale=1.0):
+        """Create a simulation.
+
+        Args:
+            config (dict): configuration as described in the module
+                documentation, default None meaning one empty board 0
+            time_scale (float): factor for all delays, default 1.0;
+                overridden by a time_scale in config
+        """
+
+        config = config or {}
+        self._name = "sim"
+        self.time_scale = config.get('time_scale', time_scale)
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._boards = {}
+        self._handles = {}
+        self._next_handle = itertools.count(_FIRST_DEVICE)
+
+        for board in config.get('boards', [{'index': 0}]):
+            self.add_board(**board)
+        for entry in config.get('instruments', []):
+            entry = dict(entry)
+            board = entry.pop('board', 0)
+            pad = entry.pop('pad')
+            sad = entry.pop('sad', NO_SAD)
+            name = entry.pop('name', None)
+            cls = entry.pop('class', None)
+            if cls:
+                module, _, attr = cls.partition(':')
+                cls = getattr(importlib.import_module(module), attr)
+            else:
+                cls = SimInstrument
+            self.add_instrument(board, pad, cls(**entry), sad, name)
+
+    @classmethod
+    def from_file(cls, path):
+        """Create a simulation from a JSON configuration file.
+
+        Args:
+            path (str): configuration file, or None for one empty board 0
+
+        Returns:
+            SimulatedLibrary: simulation
+        """
+
+        if not path:
+            return cls()
+        with open(path) as f:
+            lib = cls(json.load(f))
+        lib._name = "sim:" + path
+        return lib
+
+    def add_board(self, index, pad=0, rate=1e6, latency=50e-6):
+        """Add a virtual board.
+
+        Args:
+            index (int): board index, also its handle
+            pad (int): primary address of the board, default 0
+            rate (float): transfer rate in bytes per second, default 1e6
+            latency (float): seconds per library call, default 50e-6
+        """
+
+        if not 0 <= index < _FIRST_DEVICE:
+            raise ValueError("board index {:d} out of range".format(index))
+        with self._cond:
+            self._boards[index] = _Board(index, pad, rate, latency)
+            self._handles[index] = _Handle(index, pad, NO_SAD, T30s, 1, 0)
+
+    def add_instrument(self, board, pad, instrument, sad=NO_SAD, name=None):
+        """Connect an instrument to a virtual board, adding the board if
+        it does not exist.
+
+        Args:
+            board (int): board index
+            pad (int): primary address
+            instrument (SimInstrument): instrument
+            sad (int): secondary address, default NO_SAD
+            name (str): name for ibfind, default None
+        """
+
+        if board not in self._boards:
+            self.add_board(board)
+        with self._cond:
+            self._boards[board].instruments[(pad, sad)] = instrument
+            if name:
+                self._boards[board].names[name] = (pad, sad)
+
+    def instrument(self, board, pad, sad=NO_SAD):
+        """Get the instrument at an address.
+
+        Returns:
+            SimInstrument: instrument or None
+        """
+
+        return self._boards[board].instruments.get((pad, sad))
+
+    # per thread status, like ThreadIbsta() and friends
+
+    def getibsta(self):
+        return getattr(self._local, 'status', (0, 0, 0))[0]
+
+    def getiberr(self):
+        return getattr(self._local, 'status', (0, 0, 0))[1]
+
+    def getibcntl(self):
+        return getattr(self._local, 'status', (0, 0, 0))[2]
+
+    def _set(self, sta, err=0, cnt=0):
+        self._local.status = (sta, err, cnt)
+        return sta
+
+    # helpers, called with the lock held unless noted
+
+    def _handle(self, ud, board_only=False, device_only=False):
+        h = self._handles.get(ud)
+        if h is None:
+            raise _Failure(EDVR)
+        is_board = ud < _FIRST_DEVICE
+        if (board_only and not is_board) or (device_only and is_board):
+            raise _Failure(EARG)
+        if h.transfer is not None and not h.transfer.done:
+            raise _Failure(EOIP)
+        return h, self._boards[h.board]
+
+    def _status(self, ud, sta):
+        """Add the SRQI or RQS bits of a handle to sta."""
+
+        now = time.time()
+        h = self._handles.get(ud)
+        if h is None:
+            return sta
+        board = self._boards[h.board]
+        if ud < _FIRST_DEVICE:
+            sta |= CIC
+            if any(i._requesting(now) for i in board.instruments.values()):
+                sta |= SRQI
+        else:
+            instrument = board.instruments.get((h.pad, h.sad))
+            if instrument is not None and instrument._requesting(now):
+                sta |= RQS
+        return sta
+
+    def _next_event(self, board, now):
+        times = [t for t in (i._next_event(now)
+                             for i in board.instruments.values())
+                 if t is not None]
+        return min(times) if times else None
+
+    def _timeout(self, h):
+        seconds = _TIMEOUTS[h.tmo]
+        return None if seconds is None else seconds * self.time_scale
+
+    def _cost(self, board, nbytes):
+        return (board.latency + float(nbytes) / board.rate) * self.time_scale
+
+    def _sleep(self, seconds, transfer=None):
+        """Wait for seconds, or until transfer is cancelled. Called
+        without the lock held for synchronous calls.
+
+        Returns:
+            float: fraction of seconds waited
+        """
+
+        if seconds <= 0:
+            return 1.0
+        if transfer is None:
+            time.sleep(seconds)
+            return 1.0
+        start = time.time()
+        deadline = start + seconds
+        with self._cond:
+            while not transfer.cancelled and time.time() < deadline:
+                self._cond.wait(deadline - time.time())
+        return min(1.0, (time.time() - start) / seconds)
+
+    def _wait_for_reply(self, board, instrument, length, timeout,
+                        transfer=None):
+        """Wait until instrument has a reply ready and take up to length
+        bytes of it. Called with the lock held.
+        """
+
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            now = time.time()
+            chunk = instrument._read(length, now) if instrument else None
+            if chunk is not None:
+                return chunk
+            if transfer is not None and transfer.cancelled:
+                raise _Failure(EABO)
+            if deadline is not None and now >= deadline:
+                raise _Failure(EABO, TIMO)
+            wake = self._next_event(board, now)
+            if deadline is not None:
+                wake = deadline if wake is None else min(wake, deadline)
+            self._cond.wait(None if wake is None else wake - now)
+
+    def _address(self, board, talker, listeners):
+        """Address the bus like device-level IO does."""
+
+        board.talker = talker
+        board.listeners = set(listeners)
+        board.last_addressed = None
+        board.spoll = False
+        for addr in listeners:
+            self._listen(board, addr)
+
+    def _listen(self, board, addr):
+        """Put a device addressed to listen in remote mode if REN is set."""
+
+        instrument = board.instruments.get(addr)
+        if instrument is not None and board.remote_enable:
+            instrument.remote = True
+
+    def _read(self, ud, buf, length, transfer=None):
+        """Read from a device, or from the addressed talker of a board."""
+
+        with self._cond:
+            if transfer is None:
+                h, board = self._handle(ud)
+            else:
+                h = self._handles[ud]
+                board = self._boards[h.board]
+            own = (board.pad, NO_SAD)
+            if ud >= _FIRST_DEVICE:
+                talker = (h.pad, h.sad)
+                self._address(board, talker, [own])
+            elif board.talker is None or board.talker == own:
+                raise _Failure(EADR)
+            else:
+                talker = board.talker
+            instrument = board.instruments.get(talker)
+
+            if ud < _FIRST_DEVICE and board.spoll:
+                if instrument is None:
+                    raise _Failure(EABO, TIMO)
+                data = bytes(bytearray([
+                    instrument._serial_poll(time.time())]))
+                end = True
+            else:
+                data, end = self._wait_for_reply(
+                    board, instrument, length, self._timeout(h), transfer)
+            self._cond.notify_all()
+
+        fraction = self._sleep(self._cost(board, len(data)), transfer)
+        if fraction < 1.0:
+            data = data[:int(len(data) * fraction)]
+            ctypes.memmove(buf, data, len(data))
+            raise _Failure(EABO, 0, len(data))
+        ctypes.memmove(buf, data, len(data))
+        return (END if end else 0) | CMPL, len(data)
+
+    def _write(self, ud, data, transfer=None):
+        """Write to a device, or to the addressed listeners of a board."""
+
+        with self._cond:
+            if transfer is None:
+                h, board = self._handle(ud)
+            else:
+                h = self._handles[ud]
+                board = self._boards[h.board]
+            own = (board.pad, NO_SAD)
+            if ud >= _FIRST_DEVICE:
+                self._address(board, own, [(h.pad, h.sad)])
+            instruments = [board.instruments[addr] for addr in
+                           board.listeners if addr in board.instruments]
+            if not instruments:
+                raise _Failure(ENOL)
+
+        fraction = self._sleep(self._cost(board, len(data)), transfer)
+        if fraction < 1.0:
+            data = data[:int(len(data) * fraction)]
+        with self._cond:
+            now = time.time()
+            for instrument in instruments:
+                instrument._receive(data, h.eot and fraction == 1.0, now,
+                                    self.time_scale)
+            self._cond.notify_all()
+        if fraction < 1.0:
+            raise _Failure(EABO, 0, len(data))
+        return CMPL, len(data)
+
+    def _start(self, ud, operation, *args):
+        """Run operation(ud, *args, transfer=...) as an asynchronous
+        transfer on a worker thread.
+        """
+
+        with self._cond:
+            h, board = self._handle(ud)
+            transfer = h.transfer = _Transfer()
+
+        def run():
+            try:
+                transfer.sta, transfer.cnt = operation(
+                    ud, *args, transfer=transfer)
+            except _Failure as e:
+                transfer.sta, transfer.err, transfer.cnt = \
+                    e.sta | ERR, e.err, e.cnt
+            with self._cond:
+                transfer.done = True
+                self._cond.notify_all()
+
+        thread = threading.Thread(target=run, name="gpib-sim-transfer")
+        thread.daemon = True
+        thread.start()
+        return self._set(self._status(ud, 0))
+
+    # library entry points
+
+    @_entry()
+    def ibask(self, ud, option, result):
+        with self._cond:
+            h, board = self._handle(ud)
+            if option == IbaPAD:
+                value = h.pad
+            elif option == IbaSAD:
+                value = h.sad
+            elif option == IbaTMO:
+                value = h.tmo
+            elif option == IbaEOT:
+                value = h.eot
+            elif option == IbaBNA:
+                if ud < _FIRST_DEVICE:
+                    raise _Failure(EARG)
+                value = h.board
+            else:
+                value = h.config.get(option, 0)
+            result._obj.value = value
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibclr(self, ud):
+        with self._cond:
+            h, board = self._handle(ud, device_only=True)
+            instrument = board.instruments.get((h.pad, h.sad))
+            if instrument is None:
+                raise _Failure(ENOL)
+            self._address(board, (board.pad, NO_SAD), [(h.pad, h.sad)])
+            instrument.clear()
+        self._sleep(self._cost(board, 0))
+        return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibcmd(self, ud, cmd, count):
+        with self._cond:
+            h, board = self._handle(ud, board_only=True)
+            now = time.time()
+            ppc = False
+            for byte in bytearray(cmd[:count]):
+                byte &= 0x7f
+                if ppc and PPE <= byte <= PPD + 0xf:
+                    for addr in board.listeners:
+                        instrument = board.instruments.get(addr)
+                        if instrument is not None:
+                            instrument.ppoll_config = \
+                                byte if byte < PPD else None
+                    continue
+                ppc = byte == PPC
+                if byte == UNL:
+                    board.listeners.clear()
+                    board.last_addressed = None
+                elif LAD <= byte < UNL:
+                    board.listeners.add((byte & 0x1f, NO_SAD))
+                    board.last_addressed = ('listen', byte & 0x1f)
+                    self._listen(board, (byte & 0x1f, NO_SAD))
+                elif byte == UNT:
+                    board.talker = None
+                    board.last_addressed = None
+                elif TAD <= byte < UNT:
+                    board.talker = (byte & 0x1f, NO_SAD)
+                    board.last_addressed = ('talk', byte & 0x1f)
+                elif SAD <= byte < 0x7f and board.last_addressed:
+                    kind, pad = board.last_addressed
+                    if kind == 'talk':
+                        board.talker = (pad, byte)
+                    else:
+                        board.listeners.discard((pad, NO_SAD))
+                        board.listeners.add((pad, byte))
+                        self._listen(board, (pad, byte))
+                elif byte == SPE:
+                    board.spoll = True
+                elif byte == SPD:
+                    board.spoll = False
+                elif byte in (GET, SDC, GTL):
+                    for addr in board.listeners:
+                        instrument = board.instruments.get(addr)
+                        if instrument is None:
+                            continue
+                        if byte == GET:
+                            self._trigger(instrument, now)
+                        elif byte == SDC:
+                            instrument.clear()
+                        else:
+                            instrument.remote = False
+                elif byte == PPU:
+                    for instrument in board.instruments.values():
+                        instrument.ppoll_config = None
+                elif byte == DCL:
+                    for instrument in board.instruments.values():
+                        instrument.clear()
+                elif byte == LLO:
+                    for instrument in board.instruments.values():
+                        instrument.locked_out = True
+            self._cond.notify_all()
+        self._sleep(self._cost(board, count))
+        return self._set(self._status(ud, CMPL), 0, count)
+
+    @_entry()
+    def ibconfig(self, ud, option, value):
+        with self._cond:
+            h, board = self._handle(ud)
+            if option == IbcPAD:
+                h.pad = value
+                if ud < _FIRST_DEVICE:
+                    board.pad = value
+            elif option == IbcSAD:
+                h.sad = value
+            elif option == IbcTMO:
+                if not 0 <= value < len(_TIMEOUTS):
+                    raise _Failure(EARG)
+                h.tmo = value
+            elif option == IbcEOT:
+                h.eot = value
+            else:
+                h.config[option] = value
+            return self._set(self._status(ud, CMPL))
+
+    @_entry(failed=-1)
+    def ibdev(self, board, pad, sad, tmo, eot, eos):
+        with self._cond:
+            if board not in self._boards or not 0 <= pad <= 30 or \
+                    not 0 <= tmo < len(_TIMEOUTS):
+                raise _Failure(EARG)
+            ud = next(self._next_handle)
+            self._handles[ud] = _Handle(board, pad, sad, tmo, eot, eos)
+            self._set(self._status(ud, CMPL))
+            return ud
+
+    @_entry(failed=-1)
+    def ibfind(self, name):
+        if isinstance(name, bytes):
+            name = name.decode('ascii')
+        with self._cond:
+            for index, board in self._boards.items():
+                if name == "gpib{:d}".format(index):
+                    self._set(self._status(index, CMPL))
+                    return index
+                if name in board.names:
+                    pad, sad = board.names[name]
+                    ud = next(self._next_handle)
+                    self._handles[ud] = _Handle(index, pad, sad, T30s, 1, 0)
+                    self._set(self._status(ud, CMPL))
+                    return ud
+            raise _Failure(EDVR)
+
+    @_entry()
+    def ibln(self, ud, pad, sad, result):
+        with self._cond:
+            h, board = self._handle(ud)
+            if sad == ALL_SAD:
+                present = any(addr[0] == pad for addr in board.instruments)
+            else:
+                present = (pad, sad) in board.instruments
+            result._obj.value = int(present)
+        self._sleep(self._cost(board, 0))
+        return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def iblines(self, ud, result):
+        with self._cond:
+            h, board = self._handle(ud, board_only=True)
+            lines = ValidDAV | ValidNDAC | ValidNRFD | ValidIFC | \
+                ValidREN | ValidSRQ | ValidATN | ValidEOI
+            if self._status(ud, 0) & SRQI:
+                lines |= BusSRQ
+            if board.remote_enable:
+                lines |= BusREN
+            result._obj.value = lines
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibloc(self, ud):
+        with self._cond:
+            h, board = self._handle(ud)
+            if ud >= _FIRST_DEVICE:
+                instrument = board.instruments.get((h.pad, h.sad))
+                if instrument is not None:
+                    instrument.remote = False
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibonl(self, ud, online):
+        with self._cond:
+            if ud not in self._handles:
+                raise _Failure(EDVR)
+            h = self._handles[ud]
+            if h.transfer is not None:
+                h.transfer.cancelled = True
+                self._cond.notify_all()
+            if not online and ud >= _FIRST_DEVICE:
+                del self._handles[ud]
+                return self._set(CMPL)
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibrd(self, ud, buf, length):
+        sta, count = self._read(ud, buf, length)
+        return self._set(self._status(ud, sta), 0, count)
+
+    @_entry()
+    def ibrda(self, ud, buf, length):
+        return self._start(ud, self._read, buf, length)
+
+    @_entry()
+    def ibppc(self, ud, v):
+        if v and not PPE <= v <= PPD + 0xf:
+            raise _Failure(EARG)
+        with self._cond:
+            h, board = self._handle(ud)
+            if ud >= _FIRST_DEVICE:
+                instrument = board.instruments.get((h.pad, h.sad))
+                if instrument is None:
+                    raise _Failure(ENOL)
+                self._address(board, (board.pad, NO_SAD), [(h.pad, h.sad)])
+                instrument.ppoll_config = v if PPE <= v < PPD else None
+        self._sleep(self._cost(board, 2))
+        return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibrpp(self, ud, result):
+        with self._cond:
+            h, board = self._handle(ud, board_only=True)
+            now = time.time()
+            response = 0
+            for instrument in board.instruments.values():
+                response |= instrument._parallel_poll(now)
+            result._obj.value = bytes(bytearray([response]))
+        self._sleep(self._cost(board, 0))
+        return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibrsp(self, ud, result):
+        with self._cond:
+            h, board = self._handle(ud, device_only=True)
+            instrument = board.instruments.get((h.pad, h.sad))
+            self._address(board, None, [])
+            timeout = self._timeout(h)
+            if instrument is not None:
+                stb = instrument._serial_poll(time.time())
+                result._obj.value = bytes(bytearray([stb]))
+                self._cond.notify_all()
+        if instrument is None:
+            # nobody answers the poll
+            if timeout is None:
+                raise _Failure(ENOL)
+            self._sleep(timeout)
+            raise _Failure(EABO, TIMO)
+        self._sleep(self._cost(board, 1))
+        return self._set(self._status(ud, CMPL), 0, 1)
+
+    @_entry()
+    def ibsic(self, ud):
+        with self._cond:
+            h, board = self._handle(ud, board_only=True)
+            self._address(board, None, [])
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibspb(self, ud, result):
+        with self._cond:
+            self._handle(ud)
+            result._obj.value = 0
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibsre(self, ud, enable):
+        with self._cond:
+            h, board = self._handle(ud, board_only=True)
+            board.remote_enable = bool(enable)
+            if not enable:
+                for instrument in board.instruments.values():
+                    instrument.remote = False
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibstop(self, ud):
+        with self._cond:
+            if ud not in self._handles:
+                raise _Failure(EDVR)
+            transfer = self._handles[ud].transfer
+            if transfer is not None and not transfer.done:
+                transfer.cancelled = True
+                self._cond.notify_all()
+                while not transfer.done:
+                    self._cond.wait()
+            return self._set(self._status(ud, CMPL))
+
+    @_entry()
+    def ibtmo(self, ud, tmo):
+        return self.ibconfig(ud, IbcTMO, tmo)
+
+    @_entry()
+    def ibtrg(self, ud):
+        with self._cond:
+            h, board = self._handle(ud, device_only=True)
+            instrument = board.instruments.get((h.pad, h.sad))
+            if instrument is None:
+                raise _Failure(ENOL)
+            self._address(board, (board.pad, NO_SAD), [(h.pad, h.sad)])
+            self._trigger(instrument, time.time())
+            self._cond.notify_all()
+        self._sleep(self._cost(board, 0))
+        return self._set(self._status(ud, CMPL))
+
+    def _trigger(self, instrument, now):
+        reply = instrument._execute("*TRG", now, self.time_scale)
+        if reply is not None:
+            if not isinstance(reply, bytes):
+                reply = reply.encode('latin-1')
+            instrument._output.append(
+                [now + instrument.response_delay * self.time_scale,
+                 reply + instrument.terminator, 0])
+
+    def ibvers(self, result):
+        result._obj.value = b"sim"
+
+    @_entry()
+    def ibwait(self, ud, mask):
+        with self._cond:
+            if ud not in self._handles:
+                raise _Failure(EDVR)
+            h = self._handles[ud]
+            board = self._boards[h.board]
+            timeout = self._timeout(h) if mask & TIMO else None
+            deadline = None if timeout is None else time.time() + timeout
+            while True:
+                now = time.time()
+                transfer = h.transfer
+                sta = self._status(ud, 0)
+                if transfer is None or transfer.done:
+                    sta |= CMPL
+                    if transfer is not None:
+                        sta |= transfer.sta
+                if deadline is not None and now >= deadline:
+                    sta |= TIMO
+                if not mask or sta & mask:
+                    break
+                wake = self._next_event(board, now)
+                if deadline is not None:
+                    wake = deadline if wake is None else min(wake, deadline)
+                self._cond.wait(None if wake is None else wake - now)
+
+            if transfer is not None and transfer.done:
+                return self._set(sta, transfer.err, transfer.cnt)
+            return self._set(sta)
+
+    @_entry()
+    def ibwrt(self, ud, data, count):
+        sta, count = self._write(ud, bytes(data[:count]))
+        return self._set(self._status(ud, sta), 0, count)
+
+    @_entry()
+    def ibwrta(self, ud, data, count):
+        return self._start(ud, self._write, bytes(data[:count]))
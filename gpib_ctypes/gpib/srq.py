@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""Background service requests (SRQ) dispatching."""
+
+import concurrent.futures
+import logging
+import threading
+
+from .constants import *
+from .gpib import (
+    GpibError,
+    ask,
+    board_index,
+    serial_poll,
+    spoll_bytes,
+    timeout,
+    wait)
+
+_log = logging.getLogger(__name__)
+
+# seconds to wait between poll rounds while SRQ is asserted by a device
+# which is not registered, doubling from the first to the last value
+_STUCK_BACKOFF = (0.001, 0.1)
+
+
+class SrqDispatcher(object):
+    """Dispatches service requests to per-device callbacks and futures.
+
+    One background thread per board waits for SRQI with gpib.wait(), then
+    serial polls every registered device on that board and delivers the
+    status byte of each device which requested service. A device keeps
+    SRQ asserted until it is polled, so requests which arrive while other
+    devices are being polled are picked up by the next wait. Each request
+    is delivered exactly once because the serial poll clears RQS.
+
+    Status bytes queued by the driver's automatic serial polling, as
+    reported by gpib.spoll_bytes(), are drained after every wait.
+
+    If SRQ stays asserted although no registered device requests service,
+    eg. by a device which is not registered, a warning is logged and the
+    waiter polls with increasing pauses of up to 0.1 seconds until SRQ is
+    released, instead of polling continuously.
+
+    The waiter threads check for shutdown whenever gpib.wait() returns,
+    that is at least once per board timeout. Pass wait_timeout to use a
+    shorter board timeout while the dispatcher runs.
+
+    Example usage:
+
+    with SrqDispatcher() as dispatcher:
+        dispatcher.register(dev_handle, lambda handle, stb: print(stb))
+        gpib.write(dev_handle, b'*OPC')
+        stb = dispatcher.next_status(other_handle).result()
+    """
+
+    def __init__(self, wait_timeout=None):
+        """Create a dispatcher. Waiter threads start on first registration.
+
+        Args:
+            wait_timeout (int): board timeout constant from gpib.TNONE to
+                gpib.T1000s used while waiting, default None meaning keep
+                the board timeout
+        """
+
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._devices = {}  # board index -> {handle: [callbacks]}
+        self._futures = {}  # handle -> [pending futures]
+        self._threads = {}  # board index -> waiter thread
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def register(self, handle, callback=None):
+        """Watch a device for service requests.
+
+        Args:
+            handle (int): device handle
+            callback (callable): called as callback(handle, status_byte)
+                from the waiter thread, default None
+        """
+
+        board = board_index(handle)
+        with self._lock:
+            if self._stopping.is_set():
+                raise RuntimeError("SrqDispatcher is stopped")
+            callbacks = self._devices.setdefault(board, {}).setdefault(
+                handle, [])
+            if callback is not None:
+                callbacks.append(callback)
+            if board not in self._threads:
+                thread = threading.Thread(
+                    target=self._run, args=(board,),
+                    name="gpib{:d}-srq".format(board))
+                thread.daemon = True
+                self._threads[board] = thread
+                thread.start()
+
+    def unregister(self, handle, callback=None):
+        """Stop delivering service requests of a device to a callback.
+
+        Args:
+            handle (int): device handle
+            callback (callable): callback to remove, default None meaning
+                stop watching the device altogether
+        """
+
+        with self._lock:
+            for devices in self._devices.values():
+                if handle not in devices:
+                    continue
+                if callback is None:
+                    del devices[handle]
+                else:
+                    devices[handle].remove(callback)
+
+    def next_status(self, handle):
+        """Get a future for the next service request of a device.
+        The device is registered if needed.
+
+        Args:
+            handle (int): device handle
+
+        Returns:
+            concurrent.futures.Future: resolves to the status byte
+        """
+
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._futures.setdefault(handle, []).append(future)
+        self.register(handle)
+        return future
+
+    def stop(self, join_timeout=None):
+        """Stop all waiter threads and cancel pending futures.
+
+        Args:
+            join_timeout (float): maximum time in seconds to wait for each
+                thread to exit, default None meaning wait without a limit
+        """
+
+        self._stopping.set()
+        with self._lock:
+            threads = list(self._threads.values())
+            futures = [f for fs in self._futures.values() for f in fs]
+            self._futures.clear()
+        for thread in threads:
+            thread.join(join_timeout)
+        for future in futures:
+            future.cancel()
+
+    def _run(self, board):
+        saved_timeout = None
+        if self.wait_timeout is not None:
+            saved_timeout = ask(board, IbaTMO)
+            timeout(board, self.wait_timeout)
+
+        try:
+            no_queue = set()  # handles without a status byte queue
+            stuck = False     # SRQ asserted by an unregistered device
+            backoff = _STUCK_BACKOFF[0]
+            while not self._stopping.is_set():
+                try:
+                    sta = wait(board, SRQI | TIMO)
+                except GpibError:
+                    _log.exception("SRQ wait failed on board %d", board)
+                    self._stopping.wait(0.1)
+                    continue
+
+                with self._lock:
+                    devices = list(self._devices.get(board, {}))
+
+                requested = False
+                for handle in devices:
+                    if sta & SRQI:
+                        requested |= self._poll(handle)
+                    if handle not in no_queue:
+                        try:
+                            while spoll_bytes(handle) > 0:
+                                requested |= self._poll(handle)
+                        except (GpibError, NotImplementedError):
+                            # no status byte queue for this device
+                            no_queue.add(handle)
+
+                if requested or not sta & SRQI:
+                    if stuck and not sta & SRQI:
+                        _log.info("SRQ released on board %d", board)
+                        stuck = False
+                    backoff = _STUCK_BACKOFF[0]
+                    continue
+                if not stuck:
+                    _log.warning("SRQ asserted on board %d but no registered "
+                                 "device requests service", board)
+                    stuck = True
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, _STUCK_BACKOFF[1])
+        finally:
+            if saved_timeout is not None:
+                timeout(board, saved_timeout)
+
+    def _poll(self, handle):
+        """Serial poll a device and dispatch its service request.
+
+        Returns:
+            bool: the device requested service
+        """
+
+        try:
+            status = serial_poll(handle)
+        except GpibError:
+            _log.exception("serial poll of handle %d failed", handle)
+            return False
+
+        if not status & IbStbRQS:
+            return False
+        self._dispatch(handle, status)
+        return True
+
+    def _dispatch(self, handle, status):
+        with self._lock:
+            callbacks = []
+            for devices in self._devices.values():
+                callbacks.extend(devices.get(handle, ()))
+            futures = self._futures.pop(handle, [])
+
+        for callback in callbacks:
+            try:
+                callback(handle, status)
+            except Exception:
+                _log.exception("SRQ callback for handle %d failed", handle)
+        for future in futures:
+            if future.set_running_or_notify_cancel():
+                future.set_result(status)
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+
+"""Recording of library calls to a trace file, and replay of trace files
+without GPIB hardware.
+
+Record a session by loading the library with a trace file:
+
+gpib._load_lib(trace='session.trc')
+
+and replay it later, eg. on a machine without a GPIB board:
+
+gpib._load_lib('replay:session.trc')
+
+A trace file starts with the magic bytes GPIBTRC1, followed by one record
+per call:
+
+    name        u8 length, ASCII bytes
+    args        u8 count, then per argument a tag byte and its payload:
+                  I  int, i64
+                  B  input bytes, u32 length and data
+                  S  input text, u32 length and UTF-8 data
+                  A  ctypes array contents after the call, u32 length
+                     and data (for reads, only the bytes read)
+                  P  pointed-to object after the call, u32 length and data
+                  N  None or an unrecorded object
+    ret         tagged like an argument
+    status      ibsta i32, iberr i32, ibcntl i64
+    elapsed     f64 seconds
+    async data  u32 length and bytes which an asynchronous read placed in
+                its buffer, recorded with the ibwait which completed it
+
+All integers are little-endian.
+"""
+
+import atexit
+import collections
+import ctypes
+import struct
+import threading
+import time
+
+from .constants import *
+
+MAGIC = b'GPIBTRC1'
+
+_STATUS = struct.Struct('<iiqd')
+_INT = struct.Struct('<q')
+_LEN = struct.Struct('<I')
+
+# library functions which read data into their buffer argument
+_READ_FUNCTIONS = frozenset(('ibrd', 'ibrda'))
+
+# status accessors which are not traced
+_STATUS_FUNCTIONS = frozenset(('getibsta', 'getiberr', 'getibcntl'))
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class TraceMismatch(Exception):
+    """Raised on replay when a call does not match the recorded calls."""
+
+
+class Record(collections.namedtuple(
+        'Record', ['name', 'args', 'ret', 'sta', 'err', 'cnt', 'elapsed',
+                   'async_data'])):
+    """One recorded library call. args and ret are lists of (tag, value)
+    pairs as described in the module documentation.
+    """
+
+    __slots__ = ()
+
+
+def _object_bytes(obj):
+    return ctypes.string_at(ctypes.addressof(obj), ctypes.sizeof(obj))
+
+
+def _encode(arg, name, cnt):
+    """Tag an argument or return value for recording."""
+
+    if arg is None:
+        return b'N', None
+    if isinstance(arg, bool) or isinstance(arg, int):
+        return b'I', int(arg)
+    if isinstance(arg, bytes):
+        return b'B', arg
+    if isinstance(arg, str):
+        return b'S', arg.encode('utf-8')
+    if isinstance(arg, ctypes.Array):
+        size = ctypes.sizeof(arg)
+        if name in _READ_FUNCTIONS:
+            # ibrda data is recorded when the transfer completes
+            size = min(size, max(cnt, 0)) if name == 'ibrd' else 0
+        return b'A', ctypes.string_at(ctypes.addressof(arg), size)
+    obj = getattr(arg, '_obj', None)  # ctypes.byref()
+    if isinstance(obj, ctypes._SimpleCData) or isinstance(obj, ctypes.Array):
+        return b'P', _object_bytes(obj)
+    if isinstance(arg, ctypes._SimpleCData):
+        return b'I', arg.value
+    return b'N', None
+
+
+def _write_value(out, tag, value):
+    out.append(tag)
+    if tag == b'I':
+        out.append(_INT.pack(value))
+    elif tag != b'N':
+        out.append(_LEN.pack(len(value)))
+        out.append(value)
+
+
+def write_record(f, record):
+    """Append one record to a trace file opened for binary writing."""
+
+    name = record.name.encode('ascii')
+    out = [struct.pack('<B', len(name)), name,
+           struct.pack('<B', len(record.args))]
+    for tag, value in record.args:
+        _write_value(out, tag, value)
+    _write_value(out, *record.ret)
+    out.append(_STATUS.pack(record.sta, record.err, record.cnt,
+                            record.elapsed))
+    out.append(_LEN.pack(len(record.async_data)))
+    out.append(record.async_data)
+    f.write(b''.join(out))
+
+
+def read_records(f):
+    """Read all records of a trace file opened for binary reading.
+
+    Returns:
+        list: Record of every call in recorded order
+    """
+
+    data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("not a GPIB trace file")
+
+    pos = len(MAGIC)
+
+    def take(n):
+        chunk = data[pos:pos + n]
+        if len(chunk) < n:
+            raise ValueError("truncated GPIB trace file")
+        return chunk
+
+    def read_value():
+        tag = take(1)
+        offset = 1
+        if tag == b'I':
+            value = _INT.unpack_from(data, pos + 1)[0]
+            offset += _INT.size
+        elif tag == b'N':
+            value = None
+        else:
+            length = _LEN.unpack_from(data, pos + 1)[0]
+            value = data[pos + 1 + _LEN.size:pos + 1 + _LEN.size + length]
+            offset += _LEN.size + length
+        return (tag, value), offset
+
+    records = []
+    while pos < len(data):
+        length = ord(take(1))
+        name = take(1 + length)[1:].decode('ascii')
+        pos += 1 + length
+        nargs = ord(take(1))
+        pos += 1
+        args = []
+        for i in range(nargs):
+            value, offset = read_value()
+            args.append(value)
+            pos += offset
+        ret, offset = read_value()
+        pos += offset
+        sta, err, cnt, elapsed = _STATUS.unpack(take(_STATUS.size))
+        pos += _STATUS.size
+        length = _LEN.unpack(take(_LEN.size))[0]
+        pos += _LEN.size
+        async_data = take(length)
+        pos += length
+        records.append(Record(name, args, ret, sta, err, cnt, elapsed,
+                              async_data))
+    return records
+
+
+class TracingLibrary(object):
+    """Wraps a loaded library and records every call made through it."""
+
+    def __init__(self, lib, path):
+        """Start recording.
+
+        Args:
+            lib: loaded library, eg. ctypes.CDLL
+            path (str): trace file to create
+        """
+
+        self._lib = lib
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._pending_reads = {}  # handle -> buffer of ibrda in progress
+        atexit.register(self.close)
+
+    def __getattr__(self, name):
+        attr = getattr(self._lib, name)
+        if name in _STATUS_FUNCTIONS or name.startswith('_') or \
+                not callable(attr):
+            return attr
+
+        def traced(*args):
+            return self._traced_call(name, attr, args)
+        traced.__name__ = name
+        setattr(self, name, traced)
+        return traced
+
+    def _traced_call(self, name, func, args):
+        # Calls are not serialized here: with only global status variables,
+        # gpib._call already holds its status lock around this call.
+        lib = self._lib
+        start = _clock()
+        ret = func(*args)
+        elapsed = _clock() - start
+        sta, err, cnt = lib.getibsta(), lib.getiberr(), lib.getibcntl()
+
+        with self._lock:
+            async_data = b''
+            if name == 'ibrda' and not sta & ERR:
+                self._pending_reads[args[0]] = args[1]
+            elif name in ('ibwait', 'ibstop') and sta & (CMPL | ERR):
+                buf = self._pending_reads.pop(args[0], None)
+                if buf is not None and not sta & ERR:
+                    async_data = _object_bytes(buf)[:cnt]
+
+            if self._file is not None:
+                write_record(self._file, Record(
+                    name, [_encode(arg, name, cnt) for arg in args],
+                    _encode(ret, name, cnt), sta, err, cnt, elapsed,
+                    async_data))
+        return ret
+
+    def close(self):
+        """Finish recording and close the trace file."""
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayLibrary(object):
+    """Serves the results of recorded calls in place of a GPIB library.
+
+    Recorded calls are matched by function name and first argument, which
+    is the board or device handle for most functions, in the order they
+    were recorded. Calls on different handles may therefore be replayed in
+    a different order than recorded, eg. from several threads.
+    """
+
+    def __init__(self, path, strict=True, realtime=False):
+        """Load a trace file.
+
+        Args:
+            path (str): trace file recorded with TracingLibrary
+            strict (bool): raise TraceMismatch if integer or byte string
+                arguments differ from the recorded ones, default True
+            realtime (bool): sleep for the recorded duration of each call,
+                default False
+        """
+
+        self._name = path
+        self.strict = strict
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queues = collections.defaultdict(collections.deque)
+        self._pending_reads = {}
+
+        with open(path, 'rb') as f:
+            for record in read_records(f):
+                self._queues[self._key(record.name, record.args)].append(
+                    record)
+        self._functions = frozenset(name for name, arg in self._queues)
+
+    @staticmethod
+    def _key(name, args):
+        if args and args[0][0] in (b'I', b'S', b'B'):
+            return name, args[0][1]
+        return name, None
+
+    def functions(self):
+        """Get the names of the recorded library functions.
+
+        Returns:
+            frozenset: function names
+        """
+
+        return self._functions
+
+    def remaining(self):
+        """Get the number of recorded calls not replayed yet.
+
+        Returns:
+            int: number of calls
+        """
+
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def getibsta(self):
+        return getattr(self._local, 'status', (0, 0, 0))[0]
+
+    def getiberr(self):
+        return getattr(self._local, 'status', (0, 0, 0))[1]
+
+    def getibcntl(self):
+        return getattr(self._local, 'status', (0, 0, 0))[2]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def replayed(*args):
+            return self._replay(name, args)
+        replayed.__name__ = name
+        setattr(self, name, replayed)
+        return replayed
+
+    def _replay(self, name, args):
+        encoded = [_encode(arg, name, 0) for arg in args]
+        key = self._key(name, encoded)
+        with self._lock:
+            try:
+                record = self._queues[key].popleft()
+            except IndexError:
+                raise TraceMismatch(
+                    "no recorded {:s}() call left for {!r}".format(
+                        name, key[1]))
+
+            if self.strict:
+                recorded = [value for value in record.args]
+                for i, (tag, value) in enumerate(encoded):
+                    if tag in (b'I', b'B', b'S') and (
+                            i >= len(recorded) or recorded[i] != (tag, value)):
+                        raise TraceMismatch(
+                            "{:s}() argument {:d} is {!r}, recorded "
+                            "{!r}".format(name, i, value,
+                                          recorded[i][1] if i < len(recorded)
+                                          else None))
+
+            for arg, (tag, data) in zip(args, record.args):
+                if tag == b'A':
+                    ctypes.memmove(arg, data,
+                                   min(len(data), ctypes.sizeof(arg)))
+                elif tag == b'P':
+                    ctypes.memmove(ctypes.addressof(arg._obj), data,
+                                   min(len(data), ctypes.sizeof(arg._obj)))
+
+            if name == 'ibrda' and not record.sta & ERR:
+                self._pending_reads[args[0]] = args[1]
+            elif record.async_data:
+                buf = self._pending_reads.pop(args[0], None)
+                if buf is not None:
+                    ctypes.memmove(buf, record.async_data,
+                                   min(len(record.async_data),
+                                       ctypes.sizeof(buf)))
+
+        if self.realtime:
+            time.sleep(record.elapsed)
+        self._local.status = (record.sta, record.err, record.cnt)
+        return record.ret[1]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""Fixtures running the tests against the simulated GPIB library."""
+
+import json
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib import gpib as _gpib
+
+# board 0 at address 0 without delays, so that no test waits
+SIM_CONFIG = {
+    "time_scale": 0,
+    "boards": [{"index": 0, "pad": 0}],
+    "instruments": [
+        {"board": 0, "pad": 22, "name": "dmm",
+         "responses": {"*IDN?": "ACME,DMM,0,1.0",
+                       "READ?": "+1.234E+00",
+                       "CURV?": {"block": 100000},
+                       "WAV?": "#0abcdef",
+                       "HDR?": ":CURV #15hello"},
+         "srq": {"INIT": 1}},
+        {"board": 0, "pad": 5, "name": "psu",
+         "responses": {"*IDN?": "PSU"}},
+        {"board": 0, "pad": 7, "sad": 96,
+         "responses": {"*IDN?": "SUB"}},
+    ],
+}
+
+
+@pytest.fixture
+def sim_config(tmp_path):
+    """Path of a simulation configuration file."""
+
+    path = tmp_path / "sim.json"
+    path.write_text(json.dumps(SIM_CONFIG))
+    return str(path)
+
+
+@pytest.fixture
+def sim(sim_config):
+    """Load a fresh simulated library. Returns the simulation."""
+
+    assert gpib._load_lib("sim:" + sim_config)
+    return _gpib._lib
+
+
+@pytest.fixture
+def dmm(sim):
+    """Device handle of the instrument at address 22."""
+
+    handle = gpib.dev(0, 22)
+    yield handle
+    gpib.close(handle)
+
+
+@pytest.fixture
+def psu(sim):
+    """Device handle of the instrument at address 5."""
+
+    handle = gpib.dev(0, 5)
+    yield handle
+    gpib.close(handle)
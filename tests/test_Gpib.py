@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.Gpib`."""
+
+import gc
+import os
+import subprocess
+import sys
+import weakref
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes import Gpib
+
+IDN = b'ACME,DMM,0,1.0\n'
+
+# directory containing the gpib_ctypes package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def is_open(handle):
+    try:
+        gpib.ask(handle, gpib.IbaPAD)
+    except gpib.GpibError:
+        return False
+    return True
+
+
+def test_lazy_import():
+    # in a new interpreter, where nothing has imported Gpib yet
+    code = ("import sys, gpib_ctypes; "
+            "assert 'gpib_ctypes.Gpib' not in sys.modules; "
+            "from gpib_ctypes import Gpib; "
+            "assert gpib_ctypes.Gpib is sys.modules['gpib_ctypes.Gpib']")
+    subprocess.check_call([sys.executable, '-c', code], cwd=ROOT)
+
+
+def test_make_default_gpib():
+    code = ("import sys, gpib_ctypes; "
+            "gpib_ctypes.make_default_gpib(); "
+            "import gpib, Gpib; "
+            "assert gpib is gpib_ctypes.gpib and Gpib is gpib_ctypes.Gpib")
+    subprocess.check_call([sys.executable, '-c', code], cwd=ROOT)
+
+
+def test_device(sim):
+    with Gpib.Gpib(0, 22) as dev:
+        assert repr(dev) == 'Gpib({:d})'.format(dev.id)
+        dev.write(b'*IDN?')
+        assert dev.read() == IDN
+        assert dev.res == IDN
+        assert dev.query(b'READ?') == b'+1.234E+00\n'
+        assert dev.serial_poll() == 0
+        assert dev.spb == 0
+        handle = dev.id
+        assert is_open(handle)
+    assert not is_open(handle)
+    # closing again has no effect
+    dev.close()
+
+
+def test_find(sim):
+    with Gpib.Gpib('psu') as dev:
+        assert dev.query(b'*IDN?') == b'PSU\n'
+        handle = dev.id
+    assert not is_open(handle)
+
+
+def test_board_not_closed(sim):
+    with Gpib.Gpib(0) as board:
+        assert board.id == 0
+    assert is_open(0)
+
+
+def test_slots(sim):
+    with Gpib.Gpib(0, 22) as dev:
+        with pytest.raises(AttributeError):
+            dev.other = 1
+
+
+def test_retain_results(sim):
+    with Gpib.Gpib(0, 22, retain_results=False) as dev:
+        dev.write(b'*IDN?')
+        assert dev.read() == IDN
+        assert dev.serial_poll() == 0
+        with pytest.raises(AttributeError):
+            dev.res
+        with pytest.raises(AttributeError):
+            dev.spb
+
+
+def test_retain_results_default(sim, monkeypatch):
+    monkeypatch.setattr(Gpib.Gpib, 'retain_results', False)
+    with Gpib.Gpib(0, 22) as dev:
+        dev.query(b'*IDN?')
+        with pytest.raises(AttributeError):
+            dev.res
+    with Gpib.Gpib(0, 22, retain_results=True) as dev:
+        assert dev.query(b'*IDN?') == dev.res
+
+
+def test_handle_pool(sim):
+    pool = gpib.HandlePool()
+    with Gpib.Gpib(0, 22, handle_pool=pool) as first:
+        with Gpib.Gpib(0, 22, handle_pool=pool) as second:
+            assert first.id == second.id
+        assert pool.stats()['borrowed'] == 1
+    assert pool.stats()['borrowed'] == 0
+    # the pooled handle stays open
+    assert is_open(first.id)
+    pool.close_all()
+
+
+def test_handle_pool_default(sim, monkeypatch):
+    pool = gpib.HandlePool()
+    monkeypatch.setattr(Gpib.Gpib, 'handle_pool', pool)
+    with Gpib.Gpib('dmm') as dev:
+        assert dev.query(b'*IDN?') == IDN
+    assert pool.stats()['misses'] == 1
+    assert is_open(dev.id)
+    pool.close_all()
+
+
+def test_close_all(sim):
+    devices = [Gpib.Gpib(0, 22), Gpib.Gpib(0, 5), Gpib.Gpib(0)]
+    Gpib.close_all()
+    assert not is_open(devices[0].id)
+    assert not is_open(devices[1].id)
+    assert is_open(0)
+    assert not Gpib._open
+
+
+def test_finalizer(sim):
+    dev = Gpib.Gpib(0, 22)
+    handle = dev.id
+    ref = weakref.ref(dev)
+    del dev
+    gc.collect()
+    assert ref() is None
+    assert not is_open(handle)
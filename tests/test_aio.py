@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.aio`."""
+
+import asyncio
+import threading
+
+import pytest
+
+from gpib_ctypes import aio
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib import gpib as _gpib
+
+IDN = b'ACME,DMM,0,1.0\n'
+
+
+def test_query(sim):
+    async def main():
+        dmm = await aio.dev(0, 22)
+        psu = await aio.dev(0, 5)
+        try:
+            replies = await asyncio.gather(aio.query(dmm, b'*IDN?'),
+                                           aio.query(psu, b'*IDN?'))
+            assert replies == [IDN, b'PSU\n']
+            assert await aio.query(dmm, b'*IDN?', 4) == b'ACME'
+            assert await aio.read(dmm) == IDN[4:]
+            # replies longer than a read() default are read until END
+            assert len(await aio.query(dmm, b'CURV?')) == 100009
+        finally:
+            await aio.close(dmm)
+            await aio.close(psu)
+
+    asyncio.run(main())
+
+
+def test_read_block(sim):
+    async def main():
+        dmm = await aio.dev(0, 22)
+        try:
+            await aio.write(dmm, b'CURV?')
+            assert len(await aio.read_block(dmm)) == 100000
+        finally:
+            await aio.close(dmm)
+
+    asyncio.run(main())
+
+
+def test_board_lookup_off_loop(sim, dmm, monkeypatch):
+    threads = []
+    board_index = gpib.board_index
+
+    def recording_board_index(handle):
+        threads.append(threading.current_thread())
+        return board_index(handle)
+
+    monkeypatch.setattr(gpib, 'board_index', recording_board_index)
+    dispatcher = aio.Dispatcher()
+
+    async def main():
+        for i in range(2):
+            assert await dispatcher.run(dmm, gpib.ask, gpib.IbaPAD) == 22
+        return threading.current_thread()
+
+    try:
+        loop_thread = asyncio.run(main())
+    finally:
+        dispatcher.shutdown()
+    # looked up once, not on the event loop thread
+    assert len(threads) == 1
+    assert threads[0] is not loop_thread
+
+
+def test_cancel_read(sim):
+    async def main():
+        # reads without a timeout wait until they are aborted
+        dmm = await aio.dev(0, 22, tmo=gpib.TNONE)
+        try:
+            task = asyncio.ensure_future(aio.read(dmm))
+            while dmm not in _gpib._transfers:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # ibstop aborted the read and freed the board worker
+            assert await asyncio.wait_for(aio.query(dmm, b'*IDN?'), 5) == \
+                IDN
+        finally:
+            await aio.close(dmm)
+
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib.fast` against the stub library of the
+benchmarks, compiled with and without the Thread* status functions.
+"""
+
+import ctypes
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib import fast
+from gpib_ctypes.gpib import gpib as _gpib
+
+STUB_SOURCE = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'benchmarks', 'stub_gpib.c')
+
+
+@pytest.fixture(scope='module', params=['thread', 'global'])
+def stub_path(request, tmp_path_factory):
+    """Path of the stub library, with ThreadIbsta() or only the global
+    status variables.
+    """
+
+    cc = os.environ.get('CC', 'cc')
+    if shutil.which(cc) is None:
+        pytest.skip("no C compiler")
+    path = str(tmp_path_factory.mktemp('stub') / 'libgpib_stub.so')
+    args = [cc, '-O2', '-shared', '-fPIC', '-o', path, STUB_SOURCE]
+    if request.param == 'global':
+        args.insert(1, '-DNO_THREAD_STATUS')
+    try:
+        subprocess.check_call(args)
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("cannot compile the stub library")
+    return path, request.param
+
+
+@pytest.fixture
+def stub(stub_path):
+    """Load the stub library and bind the fast functions to it. Returns
+    a function making the next call fail with the given ibsta bits and
+    iberr.
+    """
+
+    path, mode = stub_path
+    assert gpib._load_lib(path)
+    assert (_gpib._status_lock is None) == (mode == 'thread')
+    fast.bind()
+    lib = _gpib._lib
+    error_sta = ctypes.c_int.in_dll(lib, 'stub_error_sta')
+    error_err = ctypes.c_int.in_dll(lib, 'stub_error_err')
+
+    def fail_next(sta, err):
+        error_sta.value = sta
+        error_err.value = err
+
+    yield fail_next
+    # unbind, as when the module was imported
+    for name in fast._FAST_FUNCTIONS:
+        setattr(fast, name, fast._unbound(name))
+
+
+@pytest.mark.parametrize('module', [gpib, fast])
+def test_success(stub, module):
+    handle = module.dev(0, 22)
+    assert module.write(handle, b'*IDN?') == gpib.CMPL
+    assert module.last_status() == gpib.IbStatus(gpib.CMPL, 0, 5)
+    assert module.read(handle, 4) == b'xxxx'
+    assert module.last_status() == \
+        gpib.IbStatus(gpib.CMPL | gpib.END, 0, 4)
+    assert module.command(0, b'?_') == gpib.CMPL
+    assert module.last_status().cnt == 2
+
+
+@pytest.mark.parametrize('module', [gpib, fast])
+@pytest.mark.parametrize('call', [
+    lambda m: m.read(16, 512),
+    lambda m: m.write(16, b'*IDN?'),
+    lambda m: m.command(0, b'?_'),
+], ids=['read', 'write', 'command'])
+@pytest.mark.parametrize('sta,err', [
+    (0, gpib.ENOL),
+    (gpib.TIMO | gpib.CMPL, gpib.EABO),
+], ids=['error', 'timeout'])
+def test_error(stub, module, call, sta, err):
+    stub(sta, err)
+    with pytest.raises(gpib.GpibError) as excinfo:
+        call(module)
+    expected = gpib.IbStatus(gpib.ERR | sta, err, 0)
+    assert excinfo.value.status == expected
+    assert excinfo.value.code == err
+    assert module.last_status() == expected
+
+
+def test_global_status_locked(stub):
+    lock = _gpib._status_lock
+    if lock is None:
+        pytest.skip("the library provides ThreadIbsta")
+
+    finished = threading.Event()
+
+    def write():
+        fast.write(16, b'*IDN?')
+        finished.set()
+
+    # the call waits for the status lock, like gpib.write() does
+    with lock:
+        thread = threading.Thread(target=write)
+        thread.start()
+        assert not finished.wait(0.05)
+    assert finished.wait(5)
+    thread.join()
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib` IO functions."""
+
+import array
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib import gpib as _gpib
+
+IDN = b'ACME,DMM,0,1.0\n'
+PATTERN = bytes(bytearray(range(256)))
+
+
+def block_data(size):
+    return (PATTERN * (size // len(PATTERN) + 1))[:size]
+
+
+def test_read(dmm):
+    gpib.write(dmm, b'*IDN?')
+    assert gpib.read(dmm, 512) == IDN
+
+
+def test_read_pool(dmm):
+    pool = gpib.BufferPool()
+    previous = gpib.set_read_pool(pool)
+    try:
+        for i in range(3):
+            gpib.write(dmm, b'*IDN?')
+            assert gpib.read(dmm, 100) == IDN
+    finally:
+        gpib.set_read_pool(previous)
+    assert pool.stats()['misses'] == 1
+    assert pool.stats()['hits'] == 2
+
+
+def test_read_into_offset(dmm):
+    gpib.write(dmm, b'*IDN?')
+    buf = bytearray(32)
+    assert gpib.read_into(dmm, buf, 4, 10) == 10
+    assert buf[:4] == bytearray(4)
+    assert buf[4:14] == IDN[:10]
+    assert gpib.read_into(dmm, buf) == len(IDN) - 10
+    assert buf[:len(IDN) - 10] == IDN[10:]
+
+
+def test_read_into_array(dmm):
+    gpib.write(dmm, b'*IDN?')
+    buf = array.array('B', bytes(16))
+    assert gpib.read_into(dmm, memoryview(buf)) == len(IDN)
+    assert buf.tobytes()[:len(IDN)] == IDN
+
+
+@pytest.mark.parametrize('offset,nbytes', [
+    (-1, None), (9, None), (4, 5), (0, 9), (0, -1)])
+def test_read_into_bounds(dmm, offset, nbytes):
+    gpib.write(dmm, b'*IDN?')
+    with pytest.raises(ValueError):
+        gpib.read_into(dmm, bytearray(8), offset, nbytes)
+    # nothing was read
+    assert gpib.read(dmm, 512) == IDN
+
+
+def test_read_into_readonly(dmm):
+    with pytest.raises(TypeError):
+        gpib.read_into(dmm, b'readonly')
+
+
+def test_iter_read_until_end(dmm):
+    gpib.write(dmm, b'CURV?')
+    chunks = [bytes(chunk) for chunk in gpib.iter_read(dmm, 4096)]
+    assert len(chunks) == 25
+    assert all(len(chunk) == 4096 for chunk in chunks[:-1])
+    data = b''.join(chunks)
+    assert data == b'#6100000' + block_data(100000) + b'\n'
+    # the message was read completely
+    gpib.write(dmm, b'*IDN?')
+    assert gpib.read(dmm, 512) == IDN
+
+
+def test_iter_read_short_message(dmm):
+    gpib.write(dmm, b'*IDN?')
+    assert [bytes(chunk) for chunk in gpib.iter_read(dmm)] == [IDN]
+
+
+def test_read_block_definite(dmm):
+    gpib.write(dmm, b'CURV?')
+    data = gpib.read_block(dmm)
+    assert isinstance(data, bytearray)
+    assert data == block_data(100000)
+    # the terminator was discarded
+    gpib.write(dmm, b'*IDN?')
+    assert gpib.read(dmm, 512) == IDN
+
+
+def test_read_block_chunks_into(dmm):
+    gpib.write(dmm, b'CURV?')
+    into = bytearray(100010)
+    assert gpib.read_block(dmm, into, chunk_size=1000) == 100000
+    assert into[:100000] == block_data(100000)
+    assert into[100000:] == bytearray(10)
+
+
+def test_read_block_definite_into_too_small(dmm):
+    gpib.write(dmm, b'CURV?')
+    with pytest.raises(ValueError):
+        gpib.read_block(dmm, bytearray(99999))
+
+
+def test_read_block_indefinite(dmm):
+    gpib.write(dmm, b'WAV?')
+    assert gpib.read_block(dmm) == bytearray(b'abcdef')
+
+    gpib.write(dmm, b'WAV?')
+    into = bytearray(16)
+    assert gpib.read_block(dmm, into, chunk_size=2) == 6
+    assert into[:6] == b'abcdef'
+
+
+def test_read_block_indefinite_into_too_small(dmm):
+    gpib.write(dmm, b'WAV?')
+    with pytest.raises(ValueError):
+        gpib.read_block(dmm, bytearray(4))
+
+
+def test_read_block_skips_header(dmm):
+    gpib.write(dmm, b'HDR?')
+    assert gpib.read_block(dmm) == bytearray(b'hello')
+
+
+def test_read_block_invalid_header(dmm):
+    gpib.write(dmm, b'*IDN?')
+    with pytest.raises(ValueError):
+        gpib.read_block(dmm)
+
+
+def test_query(dmm):
+    assert gpib.query(dmm, b'*IDN?') == IDN
+    assert gpib.query(dmm, b'READ?') == b'+1.234E+00\n'
+
+
+def test_query_max_len(dmm):
+    assert gpib.query(dmm, b'*IDN?', 4) == b'ACME'
+    # the rest of the reply is still pending
+    assert gpib.read(dmm, 512) == IDN[4:]
+
+
+def test_query_buffer_growth(dmm):
+    assert gpib.query(dmm, b'*IDN?') == IDN
+    assert len(_gpib._local.query_buffer) == _gpib._query_buffer_size
+
+    reply = gpib.query(dmm, b'CURV?')
+    assert reply == b'#6100000' + block_data(100000) + b'\n'
+    assert len(_gpib._local.query_buffer) >= len(reply)
+
+    # the grown buffer is reused
+    assert gpib.query(dmm, b'*IDN?') == IDN
+    assert len(_gpib._local.query_buffer) >= len(reply)
+
+
+def test_query_drops_large_buffer_on_error(sim, dmm, monkeypatch):
+    monkeypatch.setattr(_gpib, '_query_buffer_max', _gpib._query_buffer_size)
+    # start from a buffer of the initial size
+    _gpib._local.query_buffer = None
+    reads = []
+
+    def failing_read(handle, buf, nbytes):
+        reads.append(nbytes)
+        # the read after the buffer grew fails with EDVR
+        return ibrd(handle if len(reads) == 1 else 99, buf, nbytes)
+
+    ibrd = sim.ibrd
+    monkeypatch.setattr(sim, 'ibrd', failing_read)
+    with pytest.raises(gpib.GpibError):
+        gpib.query(dmm, b'CURV?')
+    assert len(reads) == 2
+    assert _gpib._local.query_buffer is None
+
+
+def test_query_many(dmm):
+    assert gpib.query_many(dmm, [b'*IDN?', b'READ?']) == \
+        [IDN, b'+1.234E+00\n']
+
+
+def test_board_index(sim, dmm):
+    assert gpib.board_index(dmm) == 0
+    assert gpib.board_index(0) == 0
+    with pytest.raises(gpib.GpibError) as excinfo:
+        gpib.board_index(99)
+    assert excinfo.value.status.err == gpib.EDVR
+
+
+def test_serial_poll_many(sim):
+    sim.instrument(0, 5).status_byte = 0x10
+    sim.instrument(0, 7, 96).status_byte = 0x01
+    assert gpib.serial_poll_many(0, [22, 5, (7, 96)]) == \
+        {22: 0, 5: 0x10, (7, 96): 0x01}
+    assert gpib.serial_poll_many(0, []) == {}
+
+
+def test_serial_poll_many_requests(sim, dmm):
+    gpib.write(dmm, b'INIT')
+    stb = gpib.serial_poll_many(0, [5, 22])
+    assert stb[22] == 1 | gpib.IbStbRQS
+    assert stb[5] == 0
+    # the serial poll cleared the request
+    assert gpib.serial_poll(dmm) == 1
+
+
+def test_find_listeners(sim):
+    assert gpib.find_listeners(0) == [5, 22]
+    assert gpib.find_listeners(0, include_secondary=True) == \
+        [5, (7, 96), 22]
+    assert gpib.find_listeners(0, pads=[0, 1, 22]) == [22]
+    assert gpib.find_listeners(0, pads=[0]) == []
+
+
+def test_find_listeners_restores_timeout(sim):
+    tmo = gpib.ask(0, gpib.IbaTMO)
+    gpib.find_listeners(0, tmo=gpib.T1ms)
+    assert gpib.ask(0, gpib.IbaTMO) == tmo
+
+
+def test_trigger_list(sim):
+    gpib.trigger_list(0, [22, (7, 96)])
+    assert list(sim.instrument(0, 22).history) == ['*TRG']
+    assert list(sim.instrument(0, 7, 96).history) == ['*TRG']
+    assert list(sim.instrument(0, 5).history) == []
+
+
+def test_clear_list(sim, dmm):
+    gpib.write(dmm, b'*IDN?')
+    gpib.clear_list(0, [22])
+    gpib.write(dmm, b'READ?')
+    assert gpib.read(dmm, 512) == b'+1.234E+00\n'
+
+
+def test_remote_local_list(sim):
+    gpib.remote_enable(0, 1)
+    gpib.remote_list(0, [5, 22])
+    assert sim.instrument(0, 5).remote
+    assert sim.instrument(0, 22).remote
+    gpib.local_list(0, [5])
+    assert not sim.instrument(0, 5).remote
+    assert sim.instrument(0, 22).remote
+
+
+@pytest.mark.parametrize('func', [
+    gpib.trigger_list, gpib.clear_list, gpib.local_list, gpib.remote_list])
+def test_list_needs_address(sim, func):
+    with pytest.raises(ValueError):
+        func(0, [])
+
+
+def test_parallel_poll_config(sim, dmm, psu):
+    assert gpib.parallel_poll(0) == 0
+    gpib.parallel_poll_config(psu, 3)
+    gpib.parallel_poll_config(dmm, 1, sense=0)
+    # the idle dmm answers for sense 0
+    assert gpib.parallel_poll(0) == 0x01
+    sim.instrument(0, 5).status_byte = gpib.IbStbRQS
+    assert gpib.parallel_poll(0) == 0x05
+
+    gpib.parallel_poll_config(dmm)
+    assert gpib.parallel_poll(0) == 0x04
+    with pytest.raises(ValueError):
+        gpib.parallel_poll_config(psu, 9)
+
+
+def test_parallel_poll_setup(sim):
+    lines = {5: 2, 22: 4, (7, 96): None}
+    gpib.parallel_poll_setup(0, lines)
+    for address in [(0, 5), (0, 22), (0, 7, 96)]:
+        sim.instrument(*address).status_byte = gpib.IbStbRQS
+    response = gpib.parallel_poll(0)
+    assert response == 0x0a
+    assert gpib.parallel_poll_addresses(response, lines) == [5, 22]
+
+    gpib.parallel_poll_unconfig(0, [5])
+    assert gpib.parallel_poll(0) == 0x08
+    gpib.parallel_poll_unconfig(0)
+    assert gpib.parallel_poll(0) == 0
+
+
+def test_parallel_poll_addresses():
+    lines = {1: 1, 2: 2, (3, 96): 3, 4: None}
+    assert gpib.parallel_poll_addresses(0x05, lines) == [1, (3, 96)]
+    assert gpib.parallel_poll_addresses(0xff, lines) == [1, 2, (3, 96)]
+    assert gpib.parallel_poll_addresses(0, lines) == []
+
+
+def test_write_broadcast(sim, psu):
+    gpib.write_broadcast(0, [5, (7, 96)], b'*IDN?\n')
+    assert gpib.read(psu, 512) == b'PSU\n'
+    sub = gpib.dev(0, 7, 96)
+    try:
+        assert gpib.read(sub, 512) == b'SUB\n'
+    finally:
+        gpib.close(sub)
+    assert list(sim.instrument(0, 22).history) == []
+
+    with pytest.raises(ValueError):
+        gpib.write_broadcast(0, [], b'X')
+
+
+def test_addressed_read_write(sim):
+    gpib.addressed_write(0, [5, 22], b'*IDN?\n')
+    assert gpib.addressed_read(0, 22, 512) == IDN
+    assert gpib.addressed_read(0, 5, 512) == b'PSU\n'
+    assert _gpib._board_addresses[0] == (0, gpib.NO_SAD)
+
+    # a new board address is looked up again
+    gpib.config(0, gpib.IbcPAD, 3)
+    assert 0 not in _gpib._board_addresses
+    gpib.addressed_write(0, [5], b'*IDN?\n')
+    assert gpib.addressed_read(0, 5, 512) == b'PSU\n'
+    assert _gpib._board_addresses[0] == (3, gpib.NO_SAD)
+
+
+def test_start_read(dmm):
+    gpib.write(dmm, b'*IDN?')
+    transfer = gpib.start_read(dmm, 512)
+    assert transfer.result(timeout=5) == IDN
+    assert transfer.done()
+    assert transfer.count == len(IDN)
+    assert not transfer.cancel()
+    assert not transfer.cancelled
+
+
+def test_start_write(dmm):
+    transfer = gpib.start_write(dmm, b'*IDN?')
+    assert transfer.result() == 5
+    assert transfer.done()
+    assert gpib.read(dmm, 512) == IDN
+
+
+def test_start_read_error(dmm):
+    # no reply pending, the read times out at once without delays
+    transfer = gpib.start_read(dmm, 512)
+    with pytest.raises(gpib.GpibError):
+        transfer.result(timeout=5)
+    assert transfer.done()
+    assert transfer.sta & gpib.ERR
+
+
+def test_start_read_cancel(sim):
+    handle = gpib.dev(0, 22, tmo=gpib.TNONE)
+    try:
+        transfer = gpib.start_read(handle, 512)
+        assert not transfer.done()
+        assert transfer.cancel()
+        assert transfer.cancelled
+        assert transfer.done()
+        with pytest.raises(gpib.GpibError):
+            transfer.result()
+    finally:
+        gpib.close(handle)
+
+
+def test_close_releases_transfer(sim):
+    handle = gpib.dev(0, 22, tmo=gpib.TNONE)
+    gpib.start_read(handle, 512)
+    assert handle in _gpib._transfers
+    gpib.close(handle)
+    assert handle not in _gpib._transfers
+
+
+def test_as_completed(sim, dmm, psu):
+    gpib.write(dmm, b'*IDN?')
+    gpib.write(psu, b'*IDN?')
+    transfers = [gpib.start_read(dmm, 512), gpib.start_read(psu, 512)]
+    results = [t.result() for t in gpib.as_completed(transfers, timeout=5)]
+    assert sorted(results) == sorted([IDN, b'PSU\n'])
+
+
+def test_last_status(dmm):
+    gpib.write(dmm, b'*IDN?')
+    assert gpib.last_status().cnt == 5
+    with pytest.raises(gpib.GpibError) as excinfo:
+        gpib.read(dmm, 512)
+        gpib.read(dmm, 512)
+    assert excinfo.value.status.sta & gpib.ERR
+    assert gpib.last_status() == excinfo.value.status
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib.metrics`."""
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib import metrics
+
+
+@pytest.fixture
+def collector(dmm):
+    collector = metrics.enable(metrics.Metrics(buckets=(1.0,)))
+    yield collector
+    metrics.disable()
+
+
+def test_snapshot(collector, dmm):
+    gpib.write(dmm, b'*IDN?')
+    gpib.read(dmm, 512)
+    with pytest.raises(gpib.GpibError):
+        gpib.read(dmm, 512)
+
+    entries = dict((entry['function'], entry)
+                   for entry in collector.snapshot())
+    assert set(entries) == {'ibrd', 'ibwrt'}
+    assert entries['ibwrt']['handle'] == dmm
+    assert entries['ibwrt']['calls'] == 1
+    assert entries['ibwrt']['bytes'] == 5
+    assert entries['ibrd']['calls'] == 2
+    assert entries['ibrd']['bytes'] == 15
+    assert entries['ibrd']['errors'] == {gpib.EABO: 1}
+    assert [count for bound, count in entries['ibrd']['buckets']] == [2, 0]
+
+    collector.reset()
+    assert collector.snapshot() == []
+
+
+def test_disable(collector, dmm):
+    assert metrics.disable() is collector
+    gpib.write(dmm, b'*IDN?')
+    assert collector.snapshot() == []
+
+
+def test_prometheus(collector, dmm):
+    collector.name_handle(dmm, 'dmm "1"')
+    gpib.write(dmm, b'*IDN?')
+    gpib.read(dmm, 512)
+    with pytest.raises(gpib.GpibError):
+        gpib.read(dmm, 512)
+
+    lines = collector.to_prometheus(prefix='test').splitlines()
+    samples = dict(line.rsplit(' ', 1) for line in lines
+                   if not line.startswith('#'))
+    labels = 'function="ibrd",handle="dmm \\"1\\""'
+    assert samples['test_calls_total{' + labels + '}'] == '2'
+    assert samples['test_bytes_total{' + labels + '}'] == '15'
+    assert samples['test_errors_total{' + labels + ',iberr="6"}'] == '1'
+    assert samples['test_call_duration_seconds_bucket{' + labels +
+                   ',le="1.0"}'] == '2'
+    assert samples['test_call_duration_seconds_bucket{' + labels +
+                   ',le="+Inf"}'] == '2'
+    assert samples['test_call_duration_seconds_count{' + labels + '}'] == \
+        '2'
+    assert float(samples['test_call_duration_seconds_sum{' + labels +
+                         '}']) >= 0.0
+
+    for name, kind in (('calls_total', 'counter'),
+                       ('bytes_total', 'counter'),
+                       ('errors_total', 'counter'),
+                       ('call_duration_seconds', 'histogram')):
+        assert '# TYPE test_{:s} {:s}'.format(name, kind) in lines
+        assert any(line.startswith('# HELP test_{:s} '.format(name))
+                   for line in lines)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib` buffer and handle pools."""
+
+import pytest
+
+from gpib_ctypes import gpib
+
+
+def test_buffer_pool_buckets():
+    pool = gpib.BufferPool(min_size=64)
+    assert pool.bucket_size(1) == 64
+    assert pool.bucket_size(64) == 64
+    assert pool.bucket_size(65) == 128
+    assert len(pool.acquire(100)) == 128
+
+
+def test_buffer_pool_counters():
+    pool = gpib.BufferPool()
+    buf = pool.acquire(512)
+    assert pool.stats() == {'hits': 0, 'misses': 1, 'evictions': 0,
+                            'idle_buffers': 0, 'idle_bytes': 0}
+    pool.release(buf)
+    assert pool.stats()['idle_bytes'] == 512
+    assert pool.acquire(300) is buf
+    assert pool.stats()['hits'] == 1
+    assert pool.stats()['idle_buffers'] == 0
+    # another bucket misses
+    pool.release(buf)
+    assert pool.acquire(1024) is not buf
+    assert pool.stats()['misses'] == 2
+
+    pool.clear()
+    assert pool.stats() == {'hits': 0, 'misses': 0, 'evictions': 0,
+                            'idle_buffers': 0, 'idle_bytes': 0}
+
+
+def test_buffer_pool_eviction():
+    pool = gpib.BufferPool(max_bytes=1024)
+    first, second, third = [pool.acquire(512) for i in range(3)]
+    pool.release(first)
+    pool.release(second)
+    pool.release(third)
+    # the least recently released buffer was evicted
+    stats = pool.stats()
+    assert stats['evictions'] == 1
+    assert stats['idle_buffers'] == 2
+    assert stats['idle_bytes'] == 1024
+    assert {id(pool.acquire(512)), id(pool.acquire(512))} == \
+        {id(second), id(third)}
+
+
+def test_buffer_pool_oversized():
+    pool = gpib.BufferPool(max_bytes=1024)
+    pool.release(pool.acquire(2048))
+    assert pool.stats()['idle_buffers'] == 0
+    assert pool.stats()['evictions'] == 0
+
+
+def test_handle_pool_shares_handles(sim):
+    pool = gpib.HandlePool()
+    with pool.dev(0, 22) as first:
+        with pool.dev(0, 22) as second:
+            assert first == second
+            assert pool.stats()['borrowed'] == 1
+        gpib.write(first, b'*IDN?')
+        assert gpib.read(first, 512) == b'ACME,DMM,0,1.0\n'
+    assert pool.stats() == {'hits': 1, 'misses': 1, 'evictions': 0,
+                            'open': 1, 'borrowed': 0}
+
+    # the idle handle is reused
+    pooled = pool.dev(0, 22)
+    assert pooled.handle == first
+    pooled.release()
+    pooled.release()
+    assert pool.stats()['hits'] == 2
+    assert pool.stats()['borrowed'] == 0
+
+    with pool.find('psu') as psu:
+        assert gpib.query(psu, b'*IDN?') == b'PSU\n'
+    assert pool.stats()['open'] == 2
+
+    pool.close_all()
+    assert pool.stats()['open'] == 0
+    with pytest.raises(gpib.GpibError):
+        gpib.write(first, b'*IDN?')
+
+
+def test_handle_pool_max_idle(sim):
+    pool = gpib.HandlePool(max_idle=1)
+    first = pool.dev(0, 22)
+    second = pool.dev(0, 5)
+    handles = (first.handle, second.handle)
+    first.release()
+    assert pool.stats()['evictions'] == 0
+    second.release()
+    # the older idle handle was closed
+    assert pool.stats()['evictions'] == 1
+    assert pool.stats()['open'] == 1
+    with pytest.raises(gpib.GpibError):
+        gpib.write(handles[0], b'*IDN?')
+    gpib.write(handles[1], b'*IDN?')
+    pool.close_all()
+
+
+def test_handle_pool_idle_timeout(sim):
+    pool = gpib.HandlePool(idle_timeout=0.0)
+    pooled = pool.dev(0, 22)
+    assert pool.evict_idle() == 0
+    pooled.release()
+    # released handles older than the timeout are closed
+    pool.evict_idle()
+    assert pool.stats()['open'] == 0
+    assert pool.stats()['evictions'] == 1
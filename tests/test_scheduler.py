@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib.scheduler` and `gpib_ctypes.gpib.executor`."""
+
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib.executor import BoardExecutor
+from gpib_ctypes.gpib.scheduler import \
+    BoardScheduler,\
+    BULK,\
+    INTERACTIVE,\
+    NORMAL
+
+IDN = b'ACME,DMM,0,1.0\n'
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = BoardScheduler(0)
+    yield scheduler
+    scheduler.shutdown()
+
+
+class Recorder(object):
+    """Operations recording the order they run in, queued while the
+    scheduler's worker is held by a gate operation.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.order = []
+        self.futures = []
+        self._gate = threading.Event()
+        self._held = threading.Event()
+        scheduler.submit(NORMAL, self._hold)
+        assert self._held.wait(5)
+
+    def _hold(self):
+        self._held.set()
+        self._gate.wait(5)
+
+    def submit(self, priority, handle, name):
+        self.futures.append(self.scheduler.submit(
+            priority, lambda handle: self.order.append(name), handle))
+
+    def release(self):
+        self._gate.set()
+        concurrent.futures.wait(self.futures, 5)
+        return self.order
+
+
+def test_priority_order(scheduler):
+    recorder = Recorder(scheduler)
+    recorder.submit(BULK, 1, 'bulk')
+    recorder.submit(NORMAL, 2, 'normal')
+    recorder.submit(INTERACTIVE, 3, 'interactive')
+    assert recorder.release() == ['interactive', 'normal', 'bulk']
+
+
+def test_handle_order(scheduler):
+    recorder = Recorder(scheduler)
+    recorder.submit(BULK, 1, 'first')
+    recorder.submit(INTERACTIVE, 1, 'second')
+    recorder.submit(BULK, 1, 'third')
+    recorder.submit(INTERACTIVE, 2, 'other')
+    assert recorder.release() == ['other', 'first', 'second', 'third']
+    assert scheduler.stats()['queued'] == 0
+
+
+def test_no_starvation():
+    scheduler = BoardScheduler(0, delays=(0.0, 0.0, 0.05))
+    try:
+        recorder = Recorder(scheduler)
+        recorder.submit(BULK, 1, 'bulk')
+        time.sleep(0.1)
+        recorder.submit(INTERACTIVE, 2, 'interactive')
+        assert recorder.release() == ['bulk', 'interactive']
+    finally:
+        scheduler.shutdown()
+
+
+def test_error_fails_future(scheduler):
+    def fail(handle):
+        raise RuntimeError("failed")
+
+    failed = scheduler.submit(NORMAL, fail, 1)
+    after = scheduler.submit(NORMAL, lambda handle: handle, 1)
+    with pytest.raises(RuntimeError):
+        failed.result(5)
+    assert after.result(5) == 1
+
+
+def test_cancel_queued(scheduler):
+    recorder = Recorder(scheduler)
+    recorder.submit(NORMAL, 1, 'cancelled')
+    recorder.submit(NORMAL, 1, 'run')
+    assert recorder.futures[0].cancel()
+    assert recorder.release() == ['run']
+
+
+def test_query(scheduler, dmm):
+    assert scheduler.query(dmm, b'*IDN?').result(5) == IDN
+
+
+def test_write_then_read_in_order(scheduler, dmm):
+    written = scheduler.write(dmm, b'*IDN?', BULK)
+    read = scheduler.submit(INTERACTIVE, gpib.read, dmm, 512)
+    assert read.result(5) == IDN
+    assert written.done()
+
+
+def test_chunked_read(sim, dmm, psu):
+    scheduler = BoardScheduler(0, chunk_size=4096)
+    try:
+        gpib.write(dmm, b'CURV?')
+        recorder = Recorder(scheduler)
+        data = scheduler.read(dmm, 200000)
+        # runs between the chunks of the read
+        query = scheduler.submit(
+            INTERACTIVE,
+            lambda handle: (data.done(), gpib.query(handle, b'*IDN?')), psu)
+        recorder.release()
+
+        assert query.result(5) == (False, b'PSU\n')
+        assert len(data.result(5)) == 100009
+        assert data.result().startswith(b'#6100000')
+        assert scheduler.stats()[BULK]['ops'] == 25
+        assert scheduler.stats()[INTERACTIVE]['ops'] == 1
+    finally:
+        scheduler.shutdown()
+
+
+def test_chunked_write(sim, dmm):
+    scheduler = BoardScheduler(0, chunk_size=2)
+    try:
+        # EOI is only sent with the last chunk, ending the message
+        assert scheduler.write(dmm, b'*IDN?').result(5) & gpib.CMPL
+        assert gpib.read(dmm, 512) == IDN
+        assert gpib.ask(dmm, gpib.IbaEOT) == 1
+        assert scheduler.stats()[BULK]['ops'] == 3
+    finally:
+        scheduler.shutdown()
+
+
+def test_stats(scheduler):
+    scheduler.submit(NORMAL, lambda: None).result(5)
+    stats = scheduler.stats()
+    assert stats[NORMAL]['ops'] == 1
+    assert stats[NORMAL]['wait_max'] >= 0.0
+    assert stats['queued'] == 0
+    scheduler.reset_stats()
+    assert scheduler.stats()[NORMAL]['ops'] == 0
+
+
+def test_shutdown_runs_queued():
+    scheduler = BoardScheduler(0)
+    recorder = Recorder(scheduler)
+    recorder.submit(NORMAL, 1, 'queued')
+    threading.Timer(0.05, recorder._gate.set).start()
+    scheduler.shutdown()
+    assert recorder.order == ['queued']
+    with pytest.raises(RuntimeError):
+        scheduler.submit(NORMAL, lambda: None)
+
+
+def test_executor_gather(sim, dmm, psu):
+    with BoardExecutor() as executor:
+        assert executor.board_of(dmm) == 0
+        results = executor.gather([
+            (gpib.write, dmm, b'*IDN?'),
+            (gpib.read, dmm, 512),
+            (gpib.query, psu, b'*IDN?'),
+        ], timeout=5)
+    assert results[1:] == [IDN, b'PSU\n']
+    with pytest.raises(RuntimeError):
+        executor.submit(gpib.read, dmm, 512)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib.sim`."""
+
+import time
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib.sim import SimInstrument
+
+
+class Counter(SimInstrument):
+    """Instrument counting its COUNT? queries."""
+
+    def __init__(self, start=0, **kwargs):
+        SimInstrument.__init__(self, **kwargs)
+        self.count = start
+
+    def handle(self, command):
+        if command == 'COUNT?':
+            self.count += 1
+            return str(self.count)
+        return SimInstrument.handle(self, command)
+
+
+def test_empty_board():
+    assert gpib._load_lib("sim:")
+    assert gpib.find_listeners(0) == []
+
+
+def test_find(sim):
+    handle = gpib.find('dmm')
+    assert gpib.ask(handle, gpib.IbaPAD) == 22
+    assert gpib.find('gpib0') == 0
+    with pytest.raises(gpib.GpibError) as excinfo:
+        gpib.find('missing')
+    assert excinfo.value.status.err == gpib.EDVR
+
+
+def test_replies(sim, dmm):
+    gpib.write(dmm, b'*IDN?;READ?')
+    assert gpib.read(dmm, 512) == b'ACME,DMM,0,1.0;+1.234E+00\n'
+    assert list(sim.instrument(0, 22).history) == ['*IDN?', 'READ?']
+
+
+def test_no_reply_times_out(dmm):
+    with pytest.raises(gpib.GpibError) as excinfo:
+        gpib.read(dmm, 512)
+    assert excinfo.value.status.sta & gpib.TIMO
+    assert excinfo.value.status.err == gpib.EABO
+
+
+def test_no_listener(sim):
+    handle = gpib.dev(0, 9)
+    with pytest.raises(gpib.GpibError) as excinfo:
+        gpib.write(handle, b'*IDN?')
+    assert excinfo.value.status.err == gpib.ENOL
+
+
+def test_invalid_handle(sim):
+    with pytest.raises(gpib.GpibError) as excinfo:
+        gpib.write(99, b'*IDN?')
+    assert excinfo.value.status.err == gpib.EDVR
+
+
+def test_board_addressing(sim):
+    gpib.command(0, bytes(bytearray([gpib.UNL, 0x20 + 5, 0x40])))
+    gpib.write(0, b'*IDN?\n')
+    gpib.command(0, bytes(bytearray([gpib.UNL, 0x40 + 5, 0x20])))
+    assert gpib.read(0, 512) == b'PSU\n'
+
+
+def test_instrument_class(sim):
+    sim.add_instrument(0, 9, Counter(start=10))
+    handle = gpib.dev(0, 9)
+    assert gpib.query(handle, b'COUNT?') == b'11\n'
+    assert gpib.query(handle, b'COUNT?') == b'12\n'
+    assert sim.instrument(0, 9).count == 12
+
+
+def test_instrument_class_config(tmp_path):
+    path = tmp_path / "sim.json"
+    path.write_text(
+        '{"instruments": [{"pad": 3, "class": "tests.test_sim:Counter", '
+        '"start": 5}]}')
+    gpib._load_lib("sim:" + str(path))
+    handle = gpib.dev(0, 3)
+    assert gpib.query(handle, b'COUNT?') == b'6\n'
+
+
+def test_timing_model(sim, dmm):
+    sim.time_scale = 1.0
+    gpib.write(dmm, b'CURV?')
+    start = time.time()
+    assert len(gpib.read(dmm, 200000)) == 100009
+    # 100009 bytes at 1e6 bytes per second
+    assert time.time() - start >= 0.1
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib.srq`."""
+
+import logging
+import threading
+import time
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib.srq import SrqDispatcher
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() >= deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+@pytest.fixture
+def dispatcher(sim):
+    dispatcher = SrqDispatcher()
+    yield dispatcher
+    dispatcher.stop(join_timeout=5)
+
+
+def test_callback_and_future(dispatcher, dmm):
+    received = []
+    delivered = threading.Event()
+
+    def callback(handle, stb):
+        received.append((handle, stb))
+        delivered.set()
+
+    dispatcher.register(dmm, callback)
+    future = dispatcher.next_status(dmm)
+    gpib.write(dmm, b'INIT')
+
+    assert future.result(timeout=5) == 1 | gpib.IbStbRQS
+    assert delivered.wait(5)
+    assert received == [(dmm, 1 | gpib.IbStbRQS)]
+
+    # the request was delivered once and the status byte polled
+    second = dispatcher.next_status(dmm)
+    gpib.write(dmm, b'INIT')
+    assert second.result(timeout=5) == 1 | gpib.IbStbRQS
+    assert wait_for(lambda: len(received) == 2)
+
+
+def test_only_requesting_devices(dispatcher, dmm, psu):
+    dmm_future = dispatcher.next_status(dmm)
+    psu_future = dispatcher.next_status(psu)
+    gpib.write(dmm, b'INIT')
+    assert dmm_future.result(timeout=5) & gpib.IbStbRQS
+    assert not psu_future.done()
+
+
+def test_unregister(dispatcher, dmm):
+    received = []
+
+    def callback(handle, stb):
+        received.append(stb)
+
+    dispatcher.register(dmm, callback)
+    dispatcher.register(dmm, callback)
+    dispatcher.unregister(dmm, callback)
+    dispatcher.unregister(dmm)
+    future = dispatcher.next_status(dmm)
+    gpib.write(dmm, b'INIT')
+    assert future.result(timeout=5)
+    assert received == []
+
+
+def test_stop(sim, dmm):
+    dispatcher = SrqDispatcher()
+    future = dispatcher.next_status(dmm)
+    dispatcher.stop(join_timeout=5)
+    assert future.cancelled()
+    with pytest.raises(RuntimeError):
+        dispatcher.register(dmm)
+
+
+def test_stuck_srq(dispatcher, sim, dmm, psu, caplog):
+    caplog.set_level(logging.INFO, logger='gpib_ctypes.gpib.srq')
+    polls = []
+
+    def count_polls(*args):
+        polls.append(args)
+        return serial_poll(*args)
+
+    # the unregistered device at address 5 holds SRQ asserted
+    sim.instrument(0, 5).status_byte = gpib.IbStbRQS
+    serial_poll = sim.ibrsp
+    sim.ibrsp = count_polls
+    dispatcher.register(dmm)
+
+    assert wait_for(lambda: 'no registered device' in caplog.text)
+    time.sleep(0.2)
+    # the waiter backs off instead of polling continuously
+    assert len(polls) < 50
+    assert caplog.text.count('no registered device') == 1
+
+    sim.ibrsp = serial_poll
+    gpib.serial_poll(psu)
+    assert wait_for(lambda: 'SRQ released' in caplog.text)
+    future = dispatcher.next_status(dmm)
+    gpib.write(dmm, b'INIT')
+    assert future.result(timeout=5) & gpib.IbStbRQS
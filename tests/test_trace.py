@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for `gpib_ctypes.gpib.trace` recording and replay."""
+
+import pytest
+
+from gpib_ctypes import gpib
+from gpib_ctypes.gpib import gpib as _gpib
+from gpib_ctypes.gpib import trace
+
+
+def session():
+    """Run calls with all kinds of arguments and return their results."""
+
+    handle = gpib.dev(0, 22)
+    results = [handle]
+    gpib.write(handle, b'*IDN?')
+    results.append(gpib.read(handle, 512))
+    gpib.write(handle, b'CURV?')
+    results.append(bytes(gpib.read_block(handle)))
+    results.append(gpib.query(handle, b'READ?'))
+    results.append(gpib.serial_poll(handle))
+    results.append(gpib.ask(handle, gpib.IbaPAD))
+    gpib.write(handle, b'*IDN?')
+    results.append(gpib.start_read(handle, 512).result())
+    results.append(gpib.find_listeners(0))
+    try:
+        gpib.read(handle, 512)
+    except gpib.GpibError as e:
+        results.append(e.status)
+    gpib.close(handle)
+    return results
+
+
+@pytest.fixture
+def recording(sim_config, tmp_path):
+    """Record session() on the simulated library. Returns the path of the
+    trace file and the results of the session.
+    """
+
+    path = str(tmp_path / "session.trc")
+    gpib._load_lib("sim:" + sim_config, trace=path)
+    results = session()
+    _gpib._lib.close()
+    return path, results
+
+
+def test_round_trip(recording):
+    path, recorded = recording
+    assert gpib._load_lib("replay:" + path)
+    lib = _gpib._lib
+    assert isinstance(lib, trace.ReplayLibrary)
+    assert session() == recorded
+    assert lib.remaining() == 0
+
+
+def test_records(recording):
+    path, recorded = recording
+    with open(path, 'rb') as f:
+        records = list(trace.read_records(f))
+    assert records[0].name == 'ibdev'
+    assert records[-1].name == 'ibonl'
+    writes = [r for r in records if r.name == 'ibwrt']
+    assert writes[0].args[1] == (b'B', b'*IDN?')
+    assert writes[0].cnt == 5
+
+
+def test_replay_mismatch(recording):
+    path, recorded = recording
+    gpib._load_lib("replay:" + path)
+    handle = gpib.dev(0, 22)
+    with pytest.raises(trace.TraceMismatch):
+        gpib.write(handle, b'READ?')
+
+
+def test_replay_not_strict(recording):
+    path, recorded = recording
+    _gpib._load_lib("replay:" + path)
+    _gpib._lib.strict = False
+    handle = gpib.dev(0, 22)
+    gpib.write(handle, b'READ?')
+    assert gpib.read(handle, 512) == recorded[1]
+
+
+def test_reload_closes_trace(sim_config, tmp_path):
+    path = str(tmp_path / "reload.trc")
+    gpib._load_lib("sim:" + sim_config, trace=path)
+    tracer = _gpib._lib
+    gpib.close(gpib.dev(0, 22))
+    gpib._load_lib("sim:" + sim_config)
+    assert tracer._file is None
+    with open(path, 'rb') as f:
+        assert [r.name for r in trace.read_records(f)] == ['ibdev', 'ibonl']
+
+
+def test_replay_cannot_trace(recording, tmp_path):
+    path, recorded = recording
+    with pytest.raises(ValueError):
+        gpib._load_lib("replay:" + path, trace=str(tmp_path / "again.trc"))